@@ -0,0 +1,278 @@
+"""JSON read API over WorkshopManager.
+
+A small Flask app for mobile clients and partner sites: catalog reads cost one
+cached query instead of a full Streamlit script run. Responses carry weak
+ETags (plus Last-Modified on workshop details) and honour If-None-Match /
+If-Modified-Since with 304s; JSON bodies are gzipped for clients that accept it.
+
+    GET  /api/workshops                      ?search=&category=&city=&level=&price=&tags=&sort=&cursor=&per_page=
+    GET  /api/workshops/<id>
+    POST /api/token                          {"email": ..., "password": ...}
+    GET  /api/me/registrations               Authorization: Bearer <token>
+    POST /api/workshops/<id>/registrations   Authorization: Bearer <token>
+
+    python api.py                            # or: flask --app api run
+"""
+import gzip
+import io
+import os
+from datetime import date, datetime
+from typing import Optional
+from flask import Flask, g, jsonify, request
+from flask_cors import CORS
+import blob_store
+from auth import (ACCESS_TOKEN_EXPIRE_MINUTES, UserSnapshot, authenticate_user, issue_token,
+                  user_from_token)
+from cache import TTLCache
+from database import AUTO_BOOTSTRAP, bootstrap
+from file_handler import ImageRejected, check_image
+from passwords import HashingBusy, admit_login
+from workshop_manager import WorkshopManager
+
+API_HOST = os.getenv("API_HOST", "127.0.0.1")
+API_PORT = int(os.getenv("API_PORT", 8000))
+API_CORS_ORIGINS = os.getenv("API_CORS_ORIGINS", "*").split(",")
+# Shared caches may serve catalog responses this long before revalidating
+API_CACHE_MAX_AGE = int(os.getenv("API_CACHE_MAX_AGE", 30))
+API_MAX_PER_PAGE = int(os.getenv("API_MAX_PER_PAGE", 50))
+API_GZIP_MIN_BYTES = int(os.getenv("API_GZIP_MIN_BYTES", 1024))
+API_GZIP_LEVEL = int(os.getenv("API_GZIP_LEVEL", 6))
+
+SORT_OPTIONS = ("relevance", "created_at", "date", "price_low", "price_high", "title")
+WORKSHOP_DETAIL_FIELDS = (
+    "id", "title", "description", "organizer", "organizer_user_id", "instructor", "date", "time",
+    "location", "city", "category", "level", "duration", "price", "organizer_upi_id", "max_seats",
+    "available_seats", "mode", "status", "image_url", "prerequisites", "what_you_learn", "agenda",
+    "created_at", "updated_at"
+)
+
+# Compressed bodies keyed by ETag; the same catalog page is served many times between writes
+_gzip_cache = TTLCache(maxsize=256, ttl=max(API_CACHE_MAX_AGE, 1), name="api_gzip")
+
+app = Flask(__name__)
+CORS(app, resources={r"/api/*": {"origins": API_CORS_ORIGINS}},
+     expose_headers=["ETag", "Last-Modified"])
+
+
+def _value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, tuple) and hasattr(value, "_asdict"):
+        return _record(value)
+    return value
+
+
+def _record(record) -> dict:
+    """JSON-ready dict of a NamedTuple record, nested records included"""
+    return {field: _value(value) for field, value in record._asdict().items()}
+
+
+def _manager() -> WorkshopManager:
+    if "wm" not in g:
+        g.wm = WorkshopManager()
+    return g.wm
+
+
+@app.teardown_appcontext
+def _close_manager(exception):
+    wm = g.pop("wm", None)
+    if wm is not None:
+        wm.close()
+
+
+def _error(status: int, message: str):
+    response = jsonify(error=message)
+    response.status_code = status
+    response.cache_control.no_store = True
+    return response
+
+
+def _conditional(payload: dict, private: bool = False, last_modified: Optional[datetime] = None):
+    """JSON response with a weak ETag, answered with 304 when the client's copy is current"""
+    response = jsonify(payload)
+    if private:
+        # Per-user data: browsers may keep it but must revalidate every time
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        response.vary.add("Authorization")
+    else:
+        response.cache_control.public = True
+        response.cache_control.max_age = API_CACHE_MAX_AGE
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # Weak, so the same validator covers the gzipped and identity encodings
+    response.add_etag(weak=True)
+    return response.make_conditional(request)
+
+
+def _current_user() -> Optional[UserSnapshot]:
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token.strip():
+        return None
+    user = user_from_token(token.strip())
+    return user if user and user.is_active else None
+
+
+@app.after_request
+def _compress(response):
+    # Whichever encoding is chosen, caches must key the response on Accept-Encoding
+    response.vary.add("Accept-Encoding")
+    if (response.status_code != 200 or response.direct_passthrough or response.mimetype != "application/json"
+            or "Content-Encoding" in response.headers
+            or not request.accept_encodings["gzip"]):
+        return response
+    data = response.get_data()
+    if len(data) < API_GZIP_MIN_BYTES:
+        return response
+    etag, _ = response.get_etag()
+    if etag:
+        compressed = _gzip_cache.get_or_set(etag, lambda: gzip.compress(data, API_GZIP_LEVEL, mtime=0))
+    else:
+        compressed = gzip.compress(data, API_GZIP_LEVEL, mtime=0)
+    response.set_data(compressed)
+    response.headers["Content-Encoding"] = "gzip"
+    return response
+
+
+@app.errorhandler(404)
+def _not_found(error):
+    return _error(404, "Not found")
+
+
+@app.errorhandler(405)
+def _method_not_allowed(error):
+    return _error(405, "Method not allowed")
+
+
+@app.get("/api/workshops")
+def list_workshops():
+    args = request.args
+    sort_by = args.get("sort") or None
+    if sort_by is not None and sort_by not in SORT_OPTIONS:
+        return _error(400, f"sort must be one of {', '.join(SORT_OPTIONS)}")
+    try:
+        per_page = min(max(int(args.get("per_page", 20)), 1), API_MAX_PER_PAGE)
+    except ValueError:
+        return _error(400, "per_page must be a number")
+    tags = [tag for value in args.getlist("tags") for tag in value.split(",") if tag.strip()]
+    filters = {
+        "search": args.get("search") or None,
+        "category": args.get("category"),
+        "city": args.get("city"),
+        "level": args.get("level"),
+        "status": args.get("status"),
+        "price_filter": args.get("price"),
+        "tags": tags,
+        "sort_by": sort_by,
+    }
+    cursor = args.get("cursor") or None
+    # Like the browse page: estimate the total on the first page only
+    result = _manager().get_workshops(filters, per_page=per_page, cursor=cursor,
+                                      count=None if cursor else "estimate", use_cache=True)
+    return _conditional({
+        "workshops": [_record(workshop) for workshop in result["workshops"]],
+        "total": result["total"],
+        "total_is_estimate": result["total_is_estimate"],
+        "next_cursor": result["next_cursor"],
+        "has_more": result["has_more"],
+    })
+
+
+@app.get("/api/workshops/<int:workshop_id>")
+def get_workshop(workshop_id: int):
+    wm = _manager()
+    workshop = wm.get_workshop_by_id(workshop_id)
+    if workshop is None:
+        return _error(404, "Workshop not found")
+    payload = {field: _value(getattr(workshop, field)) for field in WORKSHOP_DETAIL_FIELDS}
+    payload["tags"] = wm.get_workshop_tags(workshop_id)
+    return _conditional(payload, last_modified=workshop.updated_at or workshop.created_at)
+
+
+@app.post("/api/token")
+def create_token():
+    body = request.get_json(silent=True) or {}
+    email, password = body.get("email"), body.get("password")
+    if not email or not password:
+        return _error(400, "email and password are required")
+    allowed, message = admit_login(request.remote_addr, email)
+    if not allowed:
+        return _error(429, message)
+    try:
+        user = authenticate_user(email, password)
+    except HashingBusy as e:
+        return _error(503, str(e))
+    if user is None:
+        return _error(401, "Invalid email or password")
+    response = jsonify(access_token=issue_token(user), token_type="bearer",
+                       expires_in=ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+    response.cache_control.no_store = True
+    return response
+
+
+@app.get("/api/me/registrations")
+def my_registrations():
+    user = _current_user()
+    if user is None:
+        return _error(401, "Authentication required")
+    registrations = _manager().get_user_registrations(user.id)
+    return _conditional({"registrations": [_record(registration) for registration in registrations]},
+                        private=True)
+
+
+def _store_screenshot(data_uri: str) -> str:
+    decoded = blob_store.decode_data_uri(data_uri)
+    if decoded is None:
+        raise ImageRejected("payment_screenshot must be a data:image/...;base64 URI")
+    # Stored as uploaded; register_for_workshop queues the downscaling job
+    source = io.BytesIO(decoded[0])
+    return blob_store.put_stream(source, check_image(source))
+
+
+@app.post("/api/workshops/<int:workshop_id>/registrations")
+def register(workshop_id: int):
+    user = _current_user()
+    if user is None:
+        return _error(401, "Authentication required")
+    wm = _manager()
+    workshop = wm.get_workshop_by_id(workshop_id)
+    if workshop is None:
+        return _error(404, "Workshop not found")
+
+    body = request.get_json(silent=True) or {}
+    registration_data = {"notes": body.get("notes", "")}
+    if workshop.price > 0:
+        # Same requirements as the registration form
+        if not body.get("transaction_id"):
+            return _error(400, "transaction_id is required for paid workshops")
+        if not body.get("payment_screenshot"):
+            return _error(400, "payment_screenshot is required for paid workshops")
+        payment_method = (body.get("payment_method") or "upi").lower()
+        try:
+            screenshot = _store_screenshot(body["payment_screenshot"])
+        except ImageRejected as e:
+            return _error(400, f"Image rejected: {str(e)}")
+        except Exception as e:
+            return _error(400, f"Error processing image: {str(e)}")
+        registration_data.update({
+            "payment_method": payment_method,
+            "transaction_id": body["transaction_id"],
+            "upi_id": body.get("upi_id") if payment_method == "upi" else None,
+            "payment_screenshot_url": screenshot,
+        })
+
+    success, message = wm.register_for_workshop(user.id, workshop_id, registration_data)
+    if not success:
+        return _error(409, message)
+    response = jsonify(message=message)
+    response.status_code = 201
+    response.cache_control.no_store = True
+    return response
+
+
+if AUTO_BOOTSTRAP:
+    bootstrap()
+
+
+if __name__ == "__main__":
+    app.run(host=API_HOST, port=API_PORT, threaded=True)
@@ -2,20 +2,21 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime, date, timedelta
 import json
+import os
 from typing import List
 
 # Import our modules
-from database import create_tables, init_admin_user, Workshop, Registration, User
-from auth import auth_sidebar, get_current_user, require_auth, logout
-from workshop_manager import WorkshopManager
-from file_handler import save_uploaded_file, display_image, encode_image_to_base64
+from database import AUTO_BOOTSTRAP, bootstrap, Workshop, Registration, User, ScopedSession, get_pool_stats
+from auth import auth_sidebar, get_current_user, require_auth, logout, invalidate_user
+from workshop_manager import WorkshopManager, get_cache_stats
+from workshop_import import template_csv
+from registration_export import export_registrations
+from file_handler import save_uploaded_file, display_image, store_image_upload, display_stored_image, get_image_metrics
+from job_queue import get_job_metrics
 
-# Initialize database with error handling
-try:
-    create_tables()
-    init_admin_user()
-except Exception as e:
-    st.error(f"Database initialization error: {e}")
+# Initialize database once per process; later reruns skip straight past this
+if AUTO_BOOTSTRAP and not bootstrap():
+    st.error("Database initialization error")
     st.info("Please refresh the page to retry database connection.")
 
 # Page configuration
@@ -86,8 +87,10 @@ st.title("🎓 Workshop Booking Platform")
 st.markdown("*Discover and register for amazing workshops from top instructors*")
 st.markdown('</div>', unsafe_allow_html=True)
 
-# Initialize workshop manager
-wm = WorkshopManager()
+# Initialize workshop manager on this script run's session; a rerun that was
+# interrupted by st.rerun()/st.stop() may have left the previous one behind
+ScopedSession.remove()
+wm = WorkshopManager(ScopedSession())
 
 def show_workshop_browse_page():
     """Display workshop browsing page for all users"""
@@ -114,8 +117,19 @@ def show_workshop_browse_page():
             price_filters = ["All", "Free", "Paid"]
             price_filter = st.selectbox("Price", price_filters)
         with col3:
-            sort_options = ["Newest", "Date", "Price Low to High", "Price High to Low", "Title"]
-            sort_by = st.selectbox("Sort By", sort_options)
+            tag_filter = st.multiselect("Tags", wm.get_popular_tags())
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            sort_options = {
+                "Relevance": "relevance",
+                "Newest": "created_at",
+                "Date": "date",
+                "Price Low to High": "price_low",
+                "Price High to Low": "price_high",
+                "Title": "title"
+            }
+            sort_by = st.selectbox("Sort By", list(sort_options))
     
     # Get workshops
     filters = {
@@ -124,15 +138,30 @@ def show_workshop_browse_page():
         'city': city_filter,
         'level': level_filter,
         'price_filter': price_filter,
-        'sort_by': sort_by.lower().replace(' ', '_')
+        'tags': tag_filter,
+        'sort_by': sort_options[sort_by]
     }
     
-    workshops_data = wm.get_workshops(filters, page=1, per_page=10)
+    # Cursor stack for keyset pagination, reset whenever the filters change
+    filters_key = json.dumps(filters, sort_keys=True)
+    if st.session_state.get('browse_filters_key') != filters_key:
+        st.session_state.browse_filters_key = filters_key
+        st.session_state.browse_cursors = [None]
+    cursors = st.session_state.browse_cursors
+    
+    # The total is only estimated on the first page and remembered for the rest
+    first_page = len(cursors) == 1
+    workshops_data = wm.get_workshops(filters, per_page=10, cursor=cursors[-1],
+                                      count='estimate' if first_page else None, use_cache=True)
+    if first_page:
+        st.session_state.browse_total = (workshops_data['total'], workshops_data['total_is_estimate'])
+    total, total_is_estimate = st.session_state.get('browse_total', (None, False))
     workshops = workshops_data['workshops']
     
     # Display workshops
     if workshops:
-        st.subheader(f"📚 Found {workshops_data['total']} workshops")
+        if total is not None:
+            st.subheader(f"📚 Found {'about ' if total_is_estimate else ''}{total} workshops")
         
         for workshop in workshops:
             with st.container():
@@ -145,8 +174,8 @@ def show_workshop_browse_page():
                     st.write(f"👨‍🏫 **Instructor:** {workshop.instructor}")
                     st.write(f"🏢 **Organizer:** {workshop.organizer}")
                     st.write(f"📍 **Location:** {workshop.location}, {workshop.city}")
-                    if workshop.description:
-                        st.write(f"📝 {workshop.description[:100]}...")
+                    if workshop.description_snippet:
+                        st.write(f"📝 {workshop.description_snippet}...")
                 
                 with col2:
                     st.write(f"📅 **Date:** {workshop.date.strftime('%Y-%m-%d')}")
@@ -177,6 +206,19 @@ def show_workshop_browse_page():
                 # Registration form
                 if user and st.session_state.get(f'register_workshop_{workshop.id}'):
                     show_registration_form(workshop)
+        
+        # Pagination controls
+        col_prev, col_page, col_next = st.columns([1, 2, 1])
+        with col_prev:
+            if len(cursors) > 1 and st.button("← Previous", key="browse_prev"):
+                cursors.pop()
+                st.rerun()
+        with col_page:
+            st.write(f"Page {len(cursors)}")
+        with col_next:
+            if workshops_data['has_more'] and st.button("Next →", key="browse_next"):
+                cursors.append(workshops_data['next_cursor'])
+                st.rerun()
     else:
         st.info("No workshops found matching your criteria. Try adjusting your filters.")
 
@@ -228,10 +270,12 @@ def show_registration_form(workshop):
         submitted = st.form_submit_button("Submit Registration")
         
         if submitted:
-            # Handle payment screenshot upload
+            # Store the screenshot as uploaded; a background job downscales it
             payment_screenshot_data = None
             if workshop.price > 0 and payment_screenshot:
-                payment_screenshot_data = encode_image_to_base64(payment_screenshot)
+                payment_screenshot_data = store_image_upload(payment_screenshot)
+                if not payment_screenshot_data:
+                    return
             
             registration_data = {
                 'notes': notes,
@@ -292,15 +336,80 @@ def show_admin_dashboard():
     
     with col1:
         st.subheader("Recent Workshops")
-        recent_workshops = wm.get_workshops({'sort_by': 'created_at'}, per_page=5)['workshops']
+        recent_workshops = wm.get_workshops({'sort_by': 'created_at'}, per_page=5, count=None)['workshops']
         for workshop in recent_workshops:
             st.write(f"• {workshop.title} - {workshop.city}")
     
     with col2:
         st.subheader("Pending Registrations")
-        pending_registrations = wm.get_pending_registrations()[:5]
+        pending_registrations = wm.get_pending_registrations(limit=5, summary=True)
         for reg in pending_registrations:
             st.write(f"• {reg.user.name} - {reg.workshop.title}")
+    
+    with st.expander("🖼️ Upload Pipeline Metrics"):
+        image_metrics = get_image_metrics()
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Images Processed", image_metrics['images_processed'])
+            st.metric("Images Rejected", image_metrics['images_rejected'])
+        with col2:
+            st.metric("Avg Processing", f"{image_metrics['avg_process_ms']:.0f} ms")
+            st.metric("Avg Thumbnail", f"{image_metrics['avg_thumbnail_ms']:.0f} ms")
+        with col3:
+            st.metric("Bytes In", f"{image_metrics['bytes_in'] / 1024:,.0f} KB")
+            st.metric("Bytes Out", f"{image_metrics['bytes_out'] / 1024:,.0f} KB")
+        with col4:
+            st.metric("Thumbnail Cache Hits", image_metrics['thumbnail_cache_hits'])
+            st.metric("Compression Ratio", f"{image_metrics['compression_ratio']:.2f}")
+    
+    with st.expander("⚙️ Background Jobs"):
+        job_metrics = get_job_metrics()
+        st.caption("Screenshot processing and registration notifications run on job workers "
+                   "(`python job_queue.py work`). Worker counters below are for this process only.")
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Queued", job_metrics['queued'])
+            st.metric("Running", job_metrics['running'])
+        with col2:
+            st.metric("Done", job_metrics['done'])
+            st.metric("Failed", job_metrics['failed'])
+        with col3:
+            st.metric("Oldest Queued", f"{job_metrics['oldest_queued_seconds']:.0f} s")
+            st.metric("Retried", job_metrics['retried'])
+        with col4:
+            st.metric("Succeeded", job_metrics['succeeded'])
+            st.metric("Avg Run", f"{job_metrics['avg_run_ms']:.0f} ms")
+    
+    with st.expander("🔌 Database Pool"):
+        pool_stats = get_pool_stats()
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("Checked Out", f"{pool_stats.get('checked_out', 0)} / {pool_stats.get('pool_size', 0) + pool_stats.get('max_overflow', 0)}")
+            st.metric("Idle Connections", pool_stats.get('checked_in', 0))
+        with col2:
+            st.metric("Checkouts", pool_stats['checkouts'])
+            st.metric("Connections Opened", pool_stats['connects'])
+        with col3:
+            st.metric("Avg Wait", f"{pool_stats['avg_wait_ms']:.1f} ms")
+            st.metric("Max Wait", f"{pool_stats['max_wait_ms']:.1f} ms")
+        with col4:
+            st.metric("Pool Timeouts", pool_stats['timeouts'])
+            st.metric("Invalidated", pool_stats['invalidations'])
+    
+    with st.expander("🧮 Registration Counters"):
+        st.caption("Workshop registration counters are kept up to date on every status change. "
+                   "Reconcile recounts them from the registrations table and repairs any drift.")
+        if st.button("Reconcile Counters", key="reconcile_counters"):
+            success, message = wm.reconcile_registration_counters()
+            if success:
+                st.success(message)
+            else:
+                st.error(message)
+    
+    with st.expander("🗄️ Result Caches"):
+        cache_stats = pd.DataFrame(get_cache_stats())
+        cache_stats['hit_rate'] = cache_stats['hit_rate'].map(lambda rate: f"{rate:.0%}")
+        st.dataframe(cache_stats, use_container_width=True, hide_index=True)
 
 def show_workshop_management():
     """Display workshop management page"""
@@ -349,7 +458,7 @@ def show_workshop_management():
                 
                 with col3:
                     if st.button(f"Edit", key=f"edit_{workshop.id}"):
-                        st.session_state[f'edit_workshop_{workshop.id}'] = workshop
+                        st.session_state[f'edit_workshop_{workshop.id}'] = True
                         st.rerun()
                     
                     if st.button(f"Delete", key=f"delete_{workshop.id}"):
@@ -363,13 +472,42 @@ def show_workshop_management():
                 # Show edit form if edit button was clicked
                 if st.session_state.get(f'edit_workshop_{workshop.id}'):
                     st.subheader(f"Edit Workshop: {workshop.title}")
-                    show_workshop_form(workshop=st.session_state[f'edit_workshop_{workshop.id}'], form_key=f"edit_{workshop.id}")
+                    # The list row is a slim projection; edit the full, current row
+                    show_workshop_form(workshop=wm.get_workshop_by_id(workshop.id), form_key=f"edit_{workshop.id}")
                     if st.button("Cancel Edit", key=f"cancel_edit_{workshop.id}"):
                         del st.session_state[f'edit_workshop_{workshop.id}']
                         st.rerun()
     
     with tab2:
         show_workshop_form()
+        show_workshop_import()
+
+def show_workshop_import():
+    """Bulk import workshops from a CSV or Excel file"""
+    current_user = get_current_user()
+    
+    with st.expander("📥 Bulk Import from CSV / Excel"):
+        st.write("Upload a .csv or .xlsx file with one workshop per row. "
+                 "Tags are comma separated; prerequisites, what you'll learn and agenda are semicolon separated.")
+        st.download_button("Download Template", template_csv(), file_name="workshops_template.csv", mime="text/csv")
+        
+        import_file = st.file_uploader("Workshop file", type=['csv', 'xlsx'], key="workshop_import_file")
+        if import_file and st.button("Import Workshops", key="workshop_import_submit"):
+            default_organizer = current_user.name if current_user.role == "enterprise" else ""
+            try:
+                with st.spinner("Importing workshops..."):
+                    result = wm.import_workshops(import_file, import_file.name, current_user.id, default_organizer)
+            except ValueError as e:
+                st.error(f"Could not read file: {str(e)}")
+                return
+            except Exception as e:
+                st.error(f"Import failed: {str(e)}")
+                return
+            
+            st.success(f"Imported {result['imported']} of {result['rows']} workshops in {result['seconds']:.1f}s")
+            if result['errors']:
+                st.warning(f"{result['failed']} rows were skipped")
+                st.dataframe(pd.DataFrame(result['errors'], columns=["Row", "Error"]), hide_index=True)
 
 def show_workshop_form(workshop=None, form_key="workshop_form"):
     """Display workshop creation/editing form"""
@@ -410,6 +548,8 @@ def show_workshop_form(workshop=None, form_key="workshop_form"):
         workshop_date = st.date_input("Date *", value=workshop.date.date() if is_edit else date.today())
         time = st.text_input("Time *", value=workshop.time if is_edit else "", placeholder="e.g., 10:00 AM")
         description = st.text_area("Description", value=workshop.description if is_edit else "")
+        tags = st.text_input("Tags", value=", ".join(wm.get_workshop_tags(workshop.id)) if is_edit else "",
+                             placeholder="e.g., python, data science", help="Comma separated")
         
         mode = st.selectbox("Registration Mode", ["manual", "automated"], 
                            index=["manual", "automated"].index(workshop.mode) if is_edit else 0)
@@ -438,7 +578,8 @@ def show_workshop_form(workshop=None, form_key="workshop_form"):
                     'time': time,
                     'description': description,
                     'mode': mode,
-                    'organizer_upi_id': organizer_upi_id if price > 0 else None
+                    'organizer_upi_id': organizer_upi_id if price > 0 else None,
+                    'tags': [tag for tag in tags.split(",") if tag.strip()]
                 }
                 
                 if is_edit:
@@ -506,6 +647,7 @@ def show_registration_management():
                             st.write(f"**UPI ID:** {registration.upi_id}")
                         
                         if registration.payment_screenshot_url:
+                            display_stored_image(registration.payment_screenshot_url, max_width=120, thumbnail=True)
                             if st.button("View Payment Screenshot", key=f"view_screenshot_{registration.id}"):
                                 st.session_state[f'show_screenshot_{registration.id}'] = True
                         
@@ -516,11 +658,8 @@ def show_registration_management():
                     # Show payment screenshot if requested
                     if st.session_state.get(f'show_screenshot_{registration.id}') and registration.payment_screenshot_url:
                         st.subheader("Payment Screenshot")
-                        try:
-                            # Display base64 image
-                            st.markdown(f'<img src="{registration.payment_screenshot_url}" width="300">', unsafe_allow_html=True)
-                        except:
-                            st.error("Unable to display payment screenshot")
+                        # Loaded from the blob store only once the admin asks to see it
+                        display_stored_image(registration.payment_screenshot_url, max_width=300)
                         
                         col_verify, col_close = st.columns(2)
                         with col_verify:
@@ -579,8 +718,9 @@ def show_registration_management():
         # Show all registrations with filters
         st.subheader("All Registrations")
         
-        db = wm.db
-        all_registrations = db.query(Registration).order_by(Registration.registered_at.desc()).limit(50).all()
+        show_registration_export(workshop_options=wm.get_enterprise_workshop_options(None))
+        
+        all_registrations = wm.get_recent_registrations(limit=50)
         
         for registration in all_registrations:
             status_class = f"status-{registration.status.replace('_', '-')}"
@@ -598,13 +738,24 @@ def show_user_management():
     
     st.header("👥 User Management")
     
-    from database import User
-    db = wm.db
+    # Search, role filter and paging are applied in SQL
+    col1, col2, col3 = st.columns([2, 1, 1])
+    with col1:
+        user_search = st.text_input("Search by name or email", key="user_search")
+    with col2:
+        role_filter = st.selectbox("Role", ["All", "user", "enterprise", "admin"], key="user_role_filter")
+    with col3:
+        user_page = st.number_input("Page", min_value=1, value=1, step=1, key="user_page")
     
-    # Get users
-    users = db.query(User).order_by(User.created_at.desc()).limit(100).all()
+    users_data = wm.get_users(search=user_search or None, role=role_filter, page=int(user_page), per_page=25)
+    users = users_data['users']
+    st.caption(f"{users_data['total']} users · page {users_data['page']} of {max(1, users_data['total_pages'])}")
+    
+    # Activity for the whole page in a fixed number of grouped queries
+    summaries = wm.get_user_activity_summaries([user_item.id for user_item in users])
     
     for user_item in users:
+        summary = summaries[user_item.id]
         with st.expander(f"{user_item.name} ({user_item.role}) - {user_item.email}"):
             col1, col2, col3 = st.columns(3)
             
@@ -619,39 +770,23 @@ def show_user_management():
             with col2:
                 # User activity stats
                 if user_item.role == "user":
-                    registrations_count = db.query(Registration).filter(Registration.user_id == user_item.id).count()
-                    confirmed_registrations = db.query(Registration).filter(
-                        Registration.user_id == user_item.id, Registration.status == "confirmed"
-                    ).count()
-                    st.write(f"**Total Registrations:** {registrations_count}")
-                    st.write(f"**Confirmed Registrations:** {confirmed_registrations}")
+                    st.write(f"**Total Registrations:** {summary['total_registrations']}")
+                    st.write(f"**Confirmed Registrations:** {summary['confirmed_registrations']}")
                 
                 elif user_item.role == "enterprise":
-                    workshops_count = db.query(Workshop).filter(Workshop.organizer_user_id == user_item.id).count()
-                    total_registrations = db.query(Registration).join(Workshop).filter(
-                        Workshop.organizer_user_id == user_item.id
-                    ).count()
-                    st.write(f"**Workshops Created:** {workshops_count}")
-                    st.write(f"**Total Registrations Received:** {total_registrations}")
+                    st.write(f"**Workshops Created:** {summary['workshops_created']}")
+                    st.write(f"**Total Registrations Received:** {summary['registrations_received']}")
             
             with col3:
                 # Recent activity
                 st.subheader("Recent Activity")
                 if user_item.role == "user":
-                    recent_registrations = db.query(Registration).filter(
-                        Registration.user_id == user_item.id
-                    ).order_by(Registration.registered_at.desc()).limit(3).all()
-                    
-                    for reg in recent_registrations:
-                        st.write(f"• {reg.workshop.title} ({reg.status})")
+                    for title, status in summary['recent_registrations']:
+                        st.write(f"• {title} ({status})")
                 
                 elif user_item.role == "enterprise":
-                    recent_workshops = db.query(Workshop).filter(
-                        Workshop.organizer_user_id == user_item.id
-                    ).order_by(Workshop.created_at.desc()).limit(3).all()
-                    
-                    for workshop in recent_workshops:
-                        st.write(f"• {workshop.title} ({workshop.status})")
+                    for title, status in summary['recent_workshops']:
+                        st.write(f"• {title} ({status})")
 
 def show_enterprise_management():
     """Display enterprise management page for admins"""
@@ -685,12 +820,14 @@ def show_enterprise_management():
                         if st.button(f"Deactivate", key=f"deactivate_{enterprise.id}"):
                             enterprise.is_active = False
                             db.commit()
+                            invalidate_user(enterprise.id)
                             st.success("Enterprise deactivated")
                             st.rerun()
                     else:
                         if st.button(f"Activate", key=f"activate_{enterprise.id}"):
                             enterprise.is_active = True
                             db.commit()
+                            invalidate_user(enterprise.id)
                             st.success("Enterprise activated")
                             st.rerun()
     else:
@@ -707,37 +844,24 @@ def show_enterprise_dashboard():
     st.header("🏢 Enterprise Dashboard")
     
     # Get enterprise statistics
-    db = wm.db
-    total_workshops = db.query(Workshop).filter(Workshop.organizer_user_id == user.id).count()
-    active_workshops = db.query(Workshop).filter(
-        Workshop.organizer_user_id == user.id, Workshop.status == "active"
-    ).count()
-    
-    total_registrations = db.query(Registration).join(Workshop).filter(
-        Workshop.organizer_user_id == user.id
-    ).count()
-    
-    confirmed_registrations = db.query(Registration).join(Workshop).filter(
-        Workshop.organizer_user_id == user.id, Registration.status == "confirmed"
-    ).count()
+    stats = wm.get_enterprise_stats(user.id)
     
     # Display metrics
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        st.metric("Total Workshops", total_workshops)
+        st.metric("Total Workshops", stats['total_workshops'])
     with col2:
-        st.metric("Active Workshops", active_workshops)
+        st.metric("Active Workshops", stats['active_workshops'])
     with col3:
-        st.metric("Total Registrations", total_registrations)
+        st.metric("Total Registrations", stats['total_registrations'])
     with col4:
-        st.metric("Confirmed Registrations", confirmed_registrations)
+        st.metric("Confirmed Registrations", stats['confirmed_registrations'])
     
     # Recent workshops
     st.subheader("Recent Workshops")
-    recent_workshops = db.query(Workshop).filter(
-        Workshop.organizer_user_id == user.id
-    ).order_by(Workshop.created_at.desc()).limit(5).all()
+    recent_workshops = wm.get_workshops({'organizer_user_id': user.id, 'sort_by': 'created_at'},
+                                        per_page=5, count=None)['workshops']
     
     for workshop in recent_workshops:
         st.write(f"• {workshop.title} - {workshop.city} ({workshop.status})")
@@ -775,11 +899,11 @@ def show_enterprise_workshops():
                     st.write(f"**Category:** {workshop.category}")
                 
                 with col3:
-                    registrations_count = len(workshop.registrations)
+                    registrations_count = workshop.confirmed_count + workshop.pending_count + workshop.rejected_count
                     st.write(f"**Registrations:** {registrations_count}")
                     
                     if st.button(f"Edit", key=f"edit_ent_{workshop.id}"):
-                        st.session_state[f'edit_workshop_{workshop.id}'] = workshop
+                        st.session_state[f'edit_workshop_{workshop.id}'] = True
                         st.rerun()
                     
                     if st.button(f"Delete", key=f"delete_ent_{workshop.id}"):
@@ -793,7 +917,8 @@ def show_enterprise_workshops():
                 # Show edit form if edit button was clicked
                 if st.session_state.get(f'edit_workshop_{workshop.id}'):
                     st.subheader(f"Edit Workshop: {workshop.title}")
-                    show_workshop_form(workshop=st.session_state[f'edit_workshop_{workshop.id}'], form_key=f"edit_ent_{workshop.id}")
+                    # The list row is a slim projection; edit the full, current row
+                    show_workshop_form(workshop=wm.get_workshop_by_id(workshop.id), form_key=f"edit_ent_{workshop.id}")
                     if st.button("Cancel Edit", key=f"cancel_edit_ent_{workshop.id}"):
                         del st.session_state[f'edit_workshop_{workshop.id}']
                         st.rerun()
@@ -810,27 +935,29 @@ def show_enterprise_registrations():
     
     st.header("📝 Workshop Registrations")
     
-    # Get all registrations for this enterprise's workshops
-    db = wm.db
-    registrations = db.query(Registration).join(Workshop).filter(
-        Workshop.organizer_user_id == user.id
-    ).order_by(Registration.registered_at.desc()).all()
+    # Dropdown options come from a small id/title query, not from the registrations
+    workshop_options = wm.get_enterprise_workshop_options(user.id)
     
-    if registrations:
+    if workshop_options:
+        show_registration_export(organizer_user_id=user.id, workshop_options=workshop_options)
+        
         # Filter options
-        col1, col2 = st.columns(2)
+        col1, col2, col3 = st.columns([1, 2, 1])
         with col1:
             status_filter = st.selectbox("Filter by Status", ["All", "pending", "confirmed", "rejected"])
         with col2:
-            workshop_titles = list(set([reg.workshop.title for reg in registrations]))
-            workshop_filter = st.selectbox("Filter by Workshop", ["All Workshops"] + workshop_titles)
+            workshop_labels = {workshop_id: title for workshop_id, title in workshop_options}
+            workshop_filter = st.selectbox("Filter by Workshop", [None] + list(workshop_labels),
+                                           format_func=lambda workshop_id: workshop_labels.get(workshop_id, "All Workshops"))
+        with col3:
+            registrations_page = st.number_input("Page", min_value=1, value=1, step=1, key="enterprise_registrations_page")
         
-        # Apply filters
-        filtered_registrations = registrations
-        if status_filter != "All":
-            filtered_registrations = [r for r in filtered_registrations if r.status == status_filter]
-        if workshop_filter != "All Workshops":
-            filtered_registrations = [r for r in filtered_registrations if r.workshop.title == workshop_filter]
+        # Filters and paging are applied in SQL
+        registrations_data = wm.get_enterprise_registrations(
+            user.id, status=status_filter, workshop_id=workshop_filter, page=int(registrations_page), per_page=20
+        )
+        filtered_registrations = registrations_data['registrations']
+        st.caption(f"{registrations_data['total']} registrations · page {registrations_data['page']} of {max(1, registrations_data['total_pages'])}")
         
         for registration in filtered_registrations:
             with st.expander(f"{registration.user.name} - {registration.workshop.title}"):
@@ -876,6 +1003,50 @@ def show_enterprise_registrations():
     else:
         st.info("No registrations found for your workshops yet.")
 
+def show_registration_export(organizer_user_id=None, workshop_options=None):
+    """Export registrations to CSV or Excel; organizers only see their own workshops"""
+    with st.expander("⬇️ Export Registrations"):
+        workshop_labels = {workshop_id: title for workshop_id, title in (workshop_options or [])}
+        col1, col2 = st.columns(2)
+        with col1:
+            export_workshop = st.selectbox("Workshop", [None] + list(workshop_labels), key="export_workshop",
+                                           format_func=lambda workshop_id: workshop_labels.get(workshop_id, "All Workshops"))
+            export_status = st.selectbox("Status", ["All", "pending", "confirmed", "rejected"], key="export_status")
+        with col2:
+            export_from = st.date_input("Registered from", value=None, key="export_from")
+            export_to = st.date_input("Registered to", value=None, key="export_to")
+        export_format = st.radio("Format", ["csv", "xlsx"], horizontal=True, key="export_format")
+        
+        if st.button("Prepare Export", key="export_prepare"):
+            # Replace the previous export file for this session
+            previous = st.session_state.pop('registration_export', None)
+            if previous and os.path.exists(previous[0]):
+                os.remove(previous[0])
+            try:
+                with st.spinner("Exporting registrations..."):
+                    path, count = export_registrations(
+                        export_format, organizer_user_id=organizer_user_id, workshop_id=export_workshop,
+                        status=export_status, date_from=export_from, date_to=export_to
+                    )
+                st.session_state.registration_export = (path, export_format, count)
+            except Exception as e:
+                st.error(f"Export failed: {str(e)}")
+        
+        if st.session_state.get('registration_export'):
+            path, file_format, count = st.session_state.registration_export
+            if not os.path.exists(path):
+                # Purged after EXPORT_MAX_AGE_SECONDS; prepare it again
+                del st.session_state['registration_export']
+            else:
+                st.write(f"{count} registrations ready")
+                with open(path, "rb") as export_file:
+                    st.download_button(
+                        f"Download {file_format.upper()}", export_file, key="export_download",
+                        file_name=f"registrations_{datetime.now():%Y%m%d_%H%M}.{file_format}",
+                        mime="text/csv" if file_format == "csv" else
+                        "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                    )
+
 def show_my_registrations():
     """Display user's registrations"""
     user = require_auth()
@@ -976,6 +1147,7 @@ def show_user_profile():
                 
                 if success:
                     db.commit()
+                    invalidate_user(current_user.id)
                     if not change_password:
                         message = "Profile updated successfully!"
                     st.success(message)
@@ -988,36 +1160,40 @@ def show_user_profile():
                 st.error(f"Error updating profile: {str(e)}")
 
 # Page routing based on user authentication and role
-if not user:
-    show_workshop_browse_page()
-elif user.role == "admin":
-    if page == "Dashboard":
-        show_admin_dashboard()
-    elif page == "Workshop Management":
-        show_workshop_management()
-    elif page == "Registration Management":
-        show_registration_management()
-    elif page == "User Management":
-        show_user_management()
-    elif page == "Enterprise Management":
-        show_enterprise_management()
-elif user.role == "enterprise":
-    if page == "My Dashboard":
-        show_enterprise_dashboard()
-    elif page == "My Workshops":
-        show_enterprise_workshops()
-    elif page == "My Registrations":
-        show_enterprise_registrations()
-    elif page == "Create Workshop":
-        show_workshop_form()
-    elif page == "Profile":
-        show_user_profile()
-else:
-    if page == "Browse Workshops":
+try:
+    if not user:
         show_workshop_browse_page()
-    elif page == "My Registrations":
-        show_my_registrations()
-    elif page == "Profile":
-        show_user_profile()
-
-wm.close()
\ No newline at end of file
+    elif user.role == "admin":
+        if page == "Dashboard":
+            show_admin_dashboard()
+        elif page == "Workshop Management":
+            show_workshop_management()
+        elif page == "Registration Management":
+            show_registration_management()
+        elif page == "User Management":
+            show_user_management()
+        elif page == "Enterprise Management":
+            show_enterprise_management()
+    elif user.role == "enterprise":
+        if page == "My Dashboard":
+            show_enterprise_dashboard()
+        elif page == "My Workshops":
+            show_enterprise_workshops()
+        elif page == "My Registrations":
+            show_enterprise_registrations()
+        elif page == "Create Workshop":
+            show_workshop_form()
+            show_workshop_import()
+        elif page == "Profile":
+            show_user_profile()
+    else:
+        if page == "Browse Workshops":
+            show_workshop_browse_page()
+        elif page == "My Registrations":
+            show_my_registrations()
+        elif page == "Profile":
+            show_user_profile()
+finally:
+    # Return the connection to the pool when the script run ends, however it ends
+    wm.close()
+    ScopedSession.remove()
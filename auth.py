@@ -1,15 +1,47 @@
 import streamlit as st
+import os
+import time
 from datetime import datetime, timedelta
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, NamedTuple
 from jose import JWTError, jwt
-from database import User, SessionLocal
-import bcrypt
+from database import User, session_scope
+from cache import TTLCache
+from passwords import HashingBusy, admit_login, needs_rehash, verify_password
 
 # JWT Configuration
 SECRET_KEY = "workshop_platform_secret_key_2024"
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 1440  # 24 hours
 
+# Identity cache: a rerun resolves the signed-in user without a database round
+# trip for up to USER_CACHE_TTL seconds. Writes to a user call invalidate_user().
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", 60))
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", 1024))
+
+# Only honour X-Forwarded-For when the app sits behind a proxy that sets it
+TRUST_PROXY_HEADERS = os.getenv("TRUST_PROXY_HEADERS", "0").lower() in ("1", "true", "yes")
+
+class UserSnapshot(NamedTuple):
+    """Read-only copy of the user fields the UI needs, safe to share between sessions"""
+    id: int
+    name: str
+    email: str
+    phone: Optional[str]
+    role: str
+    is_active: bool
+    created_at: Optional[datetime]
+    
+    @classmethod
+    def from_user(cls, user: User) -> "UserSnapshot":
+        return cls(user.id, user.name, user.email, user.phone, user.role, user.is_active, user.created_at)
+
+_user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL, name="users")
+_token_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl=USER_CACHE_TTL, name="tokens")
+
+def invalidate_user(user_id: int):
+    """Drop a cached user so the next lookup sees its latest profile, role and status"""
+    _user_cache.invalidate(user_id)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
     if expires_delta:
@@ -21,63 +53,109 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 def verify_token(token: str) -> Optional[Dict[str, Any]]:
+    payload = _token_cache.get(token)
+    if payload is not None and payload.get("exp", 0) > time.time():
+        return payload
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
         return None
+    # Never keep a decoded token past its own expiry
+    remaining = payload.get("exp", 0) - time.time()
+    if remaining > 0:
+        _token_cache.set(token, payload, ttl=min(USER_CACHE_TTL, remaining))
+    return payload
 
-def authenticate_user(email: str, password: str) -> Optional[User]:
-    db = SessionLocal()
-    try:
+def authenticate_user(email: str, password: str) -> Optional[UserSnapshot]:
+    # bcrypt runs with no session open, so a login holds a pooled connection
+    # only for the lookup and the optional rehash write, not for the hash time
+    with session_scope() as db:
         user = db.query(User).filter(User.email == email, User.is_active == True).first()
-        if user and user.verify_password(password):
-            return user
+        if user is None:
+            return None
+        snapshot = UserSnapshot.from_user(user)
+        password_hash = user.password_hash
+    
+    if not verify_password(password, password_hash):
         return None
-    finally:
-        db.close()
+    if needs_rehash(password_hash):
+        # The cost factor changed since this hash was made; upgrade it while we have the password
+        new_hash = User.hash_password(password)
+        with session_scope() as db:
+            # Skipped if the password changed while we were hashing
+            db.query(User).filter(User.id == snapshot.id, User.password_hash == password_hash).update(
+                {User.password_hash: new_hash}, synchronize_session=False
+            )
+            db.commit()
+    _user_cache.set(snapshot.id, snapshot)
+    return snapshot
 
 def register_user(name: str, email: str, password: str, phone: str = None, role: str = "user") -> tuple[bool, str]:
-    db = SessionLocal()
-    try:
+    with session_scope() as db:
         # Check if user already exists
-        existing_user = db.query(User).filter(User.email == email).first()
-        if existing_user:
+        if db.query(User.id).filter(User.email == email).first():
             return False, "User with this email already exists"
-        
-        # Create new user with appropriate status
-        is_active = True if role == "user" else False  # Enterprise accounts need approval
-        user = User(
-            name=name,
-            email=email,
-            password_hash=User.hash_password(password),
-            phone=phone,
-            role=role,
-            is_active=is_active
-        )
-        db.add(user)
-        db.commit()
-        return True, f"{role.title()} registered successfully"
-    except Exception as e:
-        db.rollback()
+    
+    # Hashed with no session open, like authenticate_user
+    try:
+        password_hash = User.hash_password(password)
+    except HashingBusy as e:
         return False, f"Registration failed: {str(e)}"
-    finally:
-        db.close()
+    with session_scope() as db:
+        try:
+            # Create new user with appropriate status
+            is_active = True if role == "user" else False  # Enterprise accounts need approval
+            user = User(
+                name=name,
+                email=email,
+                password_hash=password_hash,
+                phone=phone,
+                role=role,
+                is_active=is_active
+            )
+            db.add(user)
+            db.commit()
+            return True, f"{role.title()} registered successfully"
+        except Exception as e:
+            db.rollback()
+            return False, f"Registration failed: {str(e)}"
 
-def get_current_user() -> Optional[User]:
+def issue_token(user: UserSnapshot) -> str:
+    """Signed access token for an authenticated user"""
+    return create_access_token(data={"user_id": user.id, "email": user.email, "role": user.role})
+
+def get_current_user() -> Optional[UserSnapshot]:
     if 'user_token' not in st.session_state:
         return None
-    
-    payload = verify_token(st.session_state.user_token)
+    return user_from_token(st.session_state.user_token)
+
+def user_from_token(token: str) -> Optional[UserSnapshot]:
+    """Resolve an access token to its user, through the identity cache"""
+    payload = verify_token(token)
     if not payload:
         return None
     
-    db = SessionLocal()
+    user_id = payload.get("user_id")
+    snapshot = _user_cache.get(user_id)
+    if snapshot is None:
+        with session_scope() as db:
+            user = db.query(User).filter(User.id == user_id).first()
+            if not user:
+                return None
+            snapshot = UserSnapshot.from_user(user)
+        _user_cache.set(user_id, snapshot)
+    return snapshot
+
+def client_ip() -> Optional[str]:
+    """Address of the browser behind the current session, if Streamlit exposes it"""
     try:
-        user = db.query(User).filter(User.id == payload.get("user_id")).first()
-        return user
-    finally:
-        db.close()
+        if TRUST_PROXY_HEADERS:
+            forwarded = st.context.headers.get("X-Forwarded-For")
+            if forwarded:
+                return forwarded.split(",")[0].strip()
+        return st.context.ip_address
+    except Exception:
+        return None
 
 def require_auth(role: str = None):
     """Decorator to require authentication"""
@@ -102,11 +180,16 @@ def login_form():
         
         if submit_button:
             if email and password:
-                user = authenticate_user(email, password)
-                if user:
+                allowed, message = admit_login(client_ip(), email)
+                try:
+                    user = authenticate_user(email, password) if allowed else None
+                except HashingBusy as e:
+                    allowed, message, user = False, str(e), None
+                if not allowed:
+                    st.error(message)
+                elif user:
                     # Create JWT token
-                    token_data = {"user_id": user.id, "email": user.email, "role": user.role}
-                    token = create_access_token(data=token_data)
+                    token = issue_token(user)
                     
                     # Store in session
                     st.session_state.user_token = token
@@ -162,6 +245,8 @@ def register_form():
 
 def logout():
     """Clear session state for logout"""
+    if 'user_token' in st.session_state:
+        _token_cache.invalidate(st.session_state.user_token)
     for key in ['user_token', 'user_id', 'user_email', 'user_name', 'user_role']:
         if key in st.session_state:
             del st.session_state[key]
@@ -0,0 +1,123 @@
+"""Catalog read benchmark: JSON API versus a Streamlit rerun.
+
+Seeds a throwaway database, serves api.py on a local port and measures
+requests per second for the workshop list (full responses and 304
+revalidations) and a workshop detail. For comparison it times reruns of the
+anonymous browse page in app.py with Streamlit's script runner, which is what
+every widget interaction costs in the Streamlit UI.
+
+    python bench_api.py --workshops 500 --clients 8 --requests 2000
+    python bench_api.py --database-url postgresql://... --reruns 50
+"""
+import argparse
+import logging
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the JSON API against Streamlit reruns")
+    parser.add_argument("--database-url", help="Database to run against (defaults to a temporary SQLite file)")
+    parser.add_argument("--workshops", type=int, default=200, help="Workshops to seed")
+    parser.add_argument("--requests", type=int, default=1000, help="API requests per scenario")
+    parser.add_argument("--clients", type=int, default=8, help="Concurrent API client threads")
+    parser.add_argument("--reruns", type=int, default=20, help="Streamlit script reruns to time")
+    return parser.parse_args()
+
+
+args = parse_args()
+os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+
+# Engine, caches and the Flask app are configured from the environment at import time
+import requests
+from werkzeug.serving import make_server
+from database import SessionLocal, User, Workshop, bootstrap
+import api
+
+
+def seed():
+    bootstrap()
+    db = SessionLocal()
+    try:
+        organizer = User(name="Bench Org", email=f"bench-{time.time_ns()}@example.com",
+                         password_hash="-", role="enterprise")
+        db.add(organizer)
+        db.flush()
+        start = datetime(2030, 1, 1)
+        for i in range(args.workshops):
+            db.add(Workshop(
+                title=f"Bench workshop {i}", description="Benchmark workshop " * 20, organizer="Bench Org",
+                organizer_user_id=organizer.id, instructor=f"Instructor {i % 17}",
+                date=start + timedelta(days=i % 365), time="10:00 AM", location="Hall", city="Pune",
+                category="Technology", level="Beginner", duration="2 hours", price=float(i % 3) * 500,
+                organizer_upi_id="bench@upi", max_seats=50, available_seats=50, mode="automated",
+                prerequisites=["Laptop"], what_you_learn=["Things"], agenda=["Intro", "Practice"]
+            ))
+        db.commit()
+        return db.query(Workshop.id).order_by(Workshop.id).first()[0]
+    finally:
+        db.close()
+
+
+def measure(label, url, headers=None, expect=200):
+    local = threading.local()
+
+    def fetch(_):
+        if not hasattr(local, "session"):
+            local.session = requests.Session()
+        started = time.perf_counter()
+        response = local.session.get(url, headers=headers)
+        return time.perf_counter() - started, response.status_code == expect
+
+    fetch(None)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        results = list(pool.map(fetch, range(args.requests)))
+    elapsed = time.perf_counter() - started
+    latencies = sorted(latency for latency, _ in results)
+    ok = sum(1 for _, matched in results if matched)
+    print(f"  {label:<28} {args.requests / elapsed:8.1f} req/s   p50 {1000 * latencies[len(latencies) // 2]:.1f} ms   "
+          f"p95 {1000 * latencies[int(len(latencies) * 0.95)]:.1f} ms   {ok}/{args.requests} HTTP {expect}")
+    return args.requests / elapsed
+
+
+def measure_streamlit():
+    from streamlit.testing.v1 import AppTest
+    app_test = AppTest.from_file("app.py", default_timeout=120)
+    app_test.run()
+    started = time.perf_counter()
+    for _ in range(args.reruns):
+        app_test.run()
+    elapsed = time.perf_counter() - started
+    print(f"  {'Streamlit browse rerun':<28} {args.reruns / elapsed:8.1f} runs/s  "
+          f"{1000 * elapsed / args.reruns:.1f} ms per run")
+    return args.reruns / elapsed
+
+
+def main():
+    workshop_id = seed()
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+    server = make_server("127.0.0.1", 0, api.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+    print(f"{args.workshops} workshops, {args.clients} clients, {args.requests} requests per scenario")
+
+    try:
+        listing = f"{base}/api/workshops?per_page=10"
+        etag = requests.get(listing).headers["ETag"]
+        list_rate = measure("GET /api/workshops", listing, {"Accept-Encoding": "gzip"})
+        measure("GET /api/workshops (304)", listing, {"If-None-Match": etag}, expect=304)
+        measure("GET /api/workshops/<id>", f"{base}/api/workshops/{workshop_id}", {"Accept-Encoding": "gzip"})
+    finally:
+        server.shutdown()
+
+    streamlit_rate = measure_streamlit()
+    print(f"API list throughput is {list_rate / streamlit_rate:.0f}x the Streamlit rerun rate")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Login throughput benchmark.
+
+Runs concurrent logins (user lookup plus bcrypt verification) against a
+throwaway database and reports logins per second, overall and per core.
+
+    python bench_login.py --rounds 12 --clients 32 --logins 200
+    PASSWORD_HASH_WORKERS=2 python bench_login.py
+
+Hashing pool size and cost come from the same environment variables as the
+app (PASSWORD_HASH_WORKERS, BCRYPT_ROUNDS), so runs can be compared directly.
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark login throughput")
+    parser.add_argument("--database-url", help="Database to run against (defaults to a temporary SQLite file)")
+    parser.add_argument("--rounds", type=int, help="bcrypt cost factor (defaults to BCRYPT_ROUNDS)")
+    parser.add_argument("--users", type=int, default=20, help="Distinct accounts to log in as")
+    parser.add_argument("--logins", type=int, default=200, help="Total login attempts")
+    parser.add_argument("--clients", type=int, default=32, help="Concurrent client threads")
+    return parser.parse_args()
+
+
+args = parse_args()
+os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'bench.db')}"
+if args.rounds:
+    os.environ["BCRYPT_ROUNDS"] = str(args.rounds)
+# The benchmark is the only client; keep admission control out of the measurement
+os.environ.setdefault("LOGIN_ATTEMPTS_PER_IP", "1000000")
+os.environ.setdefault("LOGIN_ATTEMPTS_PER_EMAIL", "1000000")
+os.environ.setdefault("PASSWORD_HASH_MAX_PENDING", str(args.clients))
+
+# Engine and hashing pool are configured from the environment at import time
+import passwords
+from database import Base, engine, SessionLocal, User
+from auth import authenticate_user
+
+PASSWORD = "benchmark-password"
+
+
+def seed():
+    Base.metadata.create_all(bind=engine)
+    password_hash = passwords.hash_password(PASSWORD)
+    db = SessionLocal()
+    try:
+        emails = []
+        for i in range(args.users):
+            email = f"bench-{i}-{time.time_ns()}@example.com"
+            db.add(User(name=f"Bench {i}", email=email, password_hash=password_hash, role="user"))
+            emails.append(email)
+        db.commit()
+        return emails
+    finally:
+        db.close()
+
+
+def main():
+    emails = seed()
+    cores = os.cpu_count() or 1
+    print(f"bcrypt cost {passwords.BCRYPT_ROUNDS}, {passwords.PASSWORD_HASH_WORKERS} hashing workers, "
+          f"{args.clients} clients, {cores} cores")
+
+    latencies = []
+
+    def login(i):
+        started = time.perf_counter()
+        user = authenticate_user(emails[i % len(emails)], PASSWORD)
+        latencies.append(time.perf_counter() - started)
+        return user is not None
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        results = list(pool.map(login, range(args.logins)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    throughput = args.logins / elapsed
+    print(f"{sum(results)}/{args.logins} logins succeeded in {elapsed:.2f}s")
+    print(f"  {throughput:.1f} logins/s, {throughput / min(cores, passwords.PASSWORD_HASH_WORKERS):.1f} logins/s per hashing core")
+    print(f"  latency p50 {1000 * latencies[len(latencies) // 2]:.0f} ms, "
+          f"p95 {1000 * latencies[int(len(latencies) * 0.95)]:.0f} ms, max {1000 * latencies[-1]:.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+import os
+import re
+import base64
+import hashlib
+import tempfile
+from io import BytesIO
+from typing import BinaryIO, Optional
+
+# Content-addressed blob store for uploaded files.
+# Blobs are written once under BLOB_STORE_DIR/<aa>/<bb>/<sha256>.<ext> and
+# referenced from database rows by a short key, "blob:<sha256>.<ext>".
+# Identical uploads hash to the same key and are stored only once.
+
+BLOB_STORE_DIR = os.getenv("BLOB_STORE_DIR", os.path.join("uploads", "blobs"))
+BLOB_KEY_PREFIX = "blob:"
+CHUNK_SIZE = 64 * 1024
+
+_KEY_PATTERN = re.compile(r"^blob:([0-9a-f]{64})\.([a-z0-9]{1,8})$")
+
+
+def is_blob_key(value: Optional[str]) -> bool:
+    """True if value is a blob store key rather than a legacy inline payload"""
+    return bool(value) and _KEY_PATTERN.match(value) is not None
+
+
+def blob_path(key: str) -> str:
+    """Filesystem path for a blob key; rejects anything that is not a valid key"""
+    match = _KEY_PATTERN.match(key or "")
+    if not match:
+        raise ValueError(f"Invalid blob key: {key!r}")
+    digest, extension = match.groups()
+    return os.path.join(BLOB_STORE_DIR, digest[:2], digest[2:4], f"{digest}.{extension}")
+
+
+def _normalize_extension(extension: str) -> str:
+    extension = (extension or "bin").lower().lstrip(".")
+    if extension == "jpeg":
+        extension = "jpg"
+    if not re.fullmatch(r"[a-z0-9]{1,8}", extension):
+        raise ValueError(f"Unsupported file extension: {extension!r}")
+    return extension
+
+
+def put_stream(stream: BinaryIO, extension: str) -> str:
+    """Store the contents of a file-like object and return its key.
+
+    The stream is hashed while it is copied to a temporary file in chunks, so
+    memory use does not depend on the upload size. If the content is already
+    stored the temporary copy is discarded.
+    """
+    extension = _normalize_extension(extension)
+    os.makedirs(BLOB_STORE_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    fd, temp_path = tempfile.mkstemp(dir=BLOB_STORE_DIR, prefix=".upload-")
+    try:
+        with os.fdopen(fd, "wb") as temp_file:
+            for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+                temp_file.write(chunk)
+
+        key = f"{BLOB_KEY_PREFIX}{digest.hexdigest()}.{extension}"
+        path = blob_path(key)
+        if os.path.exists(path):
+            os.remove(temp_path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Atomic publish: readers never observe a partially written blob
+            os.replace(temp_path, path)
+        return key
+    except Exception:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+def put_bytes(data: bytes, extension: str) -> str:
+    """Store an in-memory payload and return its key"""
+    return put_stream(BytesIO(data), extension)
+
+
+def exists(key: str) -> bool:
+    return is_blob_key(key) and os.path.exists(blob_path(key))
+
+
+def open_blob(key: str) -> BinaryIO:
+    """Open a stored blob for reading"""
+    return open(blob_path(key), "rb")
+
+
+def read_blob(key: str) -> bytes:
+    with open_blob(key) as blob:
+        return blob.read()
+
+
+def variant_path(key: str, variant: str, extension: str) -> str:
+    """Path of a derived file (e.g. a thumbnail) cached alongside a blob"""
+    source = blob_path(key)
+    digest = os.path.basename(source).split(".", 1)[0]
+    if not re.fullmatch(r"[a-z0-9_-]{1,32}", variant):
+        raise ValueError(f"Invalid variant name: {variant!r}")
+    return os.path.join(os.path.dirname(source), f"{digest}.{variant}.{_normalize_extension(extension)}")
+
+
+def read_variant(key: str, variant: str, extension: str) -> Optional[bytes]:
+    """Cached variant bytes, or None if it has not been generated yet"""
+    try:
+        with open(variant_path(key, variant, extension), "rb") as cached:
+            return cached.read()
+    except FileNotFoundError:
+        return None
+
+
+def put_variant(key: str, variant: str, extension: str, data: bytes) -> None:
+    """Cache a derived file for a blob"""
+    path = variant_path(key, variant, extension)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".variant-")
+    with os.fdopen(fd, "wb") as temp_file:
+        temp_file.write(data)
+    os.replace(temp_path, path)
+
+
+_DATA_URI_PATTERN = re.compile(r"^data:image/([a-z0-9.+-]+);base64,", re.IGNORECASE)
+
+
+def decode_data_uri(value: str) -> Optional[tuple[bytes, str]]:
+    """Decode a legacy `data:image/...;base64,` payload into (bytes, extension)"""
+    match = _DATA_URI_PATTERN.match(value or "")
+    if not match:
+        return None
+    # MIME subtypes such as "svg+xml" or "x-icon" are not valid file extensions as-is
+    extension = re.sub(r"[^a-z0-9]", "", match.group(1).lower().split("+")[0])[:8] or "bin"
+    return base64.b64decode(value[match.end():]), extension
+
+
+def migrate_inline_screenshots(batch_size: int = 100) -> int:
+    """Move base64 screenshots stored in registrations into the blob store.
+
+    Rows whose payload cannot be decoded or stored are logged and left as they
+    are; the inline value may be the only copy of the payment proof.
+    """
+    from sqlalchemy import update
+    from database import SessionLocal, Registration
+
+    migrated = 0
+    last_id = 0
+    db = SessionLocal()
+    try:
+        while True:
+            # Walk by id so rows that are skipped are not fetched again
+            rows = db.query(Registration.id, Registration.payment_screenshot_url).filter(
+                Registration.payment_screenshot_url.like("data:%"),
+                Registration.id > last_id
+            ).order_by(Registration.id).limit(batch_size).all()
+            if not rows:
+                break
+            for registration_id, value in rows:
+                last_id = registration_id
+                try:
+                    decoded = decode_data_uri(value)
+                    if decoded is None:
+                        raise ValueError("not a base64 image data URI")
+                    key = put_bytes(*decoded)
+                except Exception as e:
+                    print(f"Skipped registration {registration_id}: {e}")
+                    continue
+                db.execute(
+                    update(Registration)
+                    .where(Registration.id == registration_id)
+                    .values(payment_screenshot_url=key)
+                )
+                migrated += 1
+            db.commit()
+    finally:
+        db.close()
+    return migrated
+
+
+if __name__ == "__main__":
+    count = migrate_inline_screenshots()
+    print(f"Moved {count} inline payment screenshots into {BLOB_STORE_DIR}")
@@ -0,0 +1,120 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+# Process-wide in-memory caches shared by every Streamlit session.
+# Values must be safe to share between threads (plain data, not live ORM
+# instances bound to a session). Invalidation state that other processes must
+# see lives in the database (TableVersions).
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe cache with a bounded size (LRU eviction) and per-entry expiry"""
+
+    def __init__(self, maxsize: int = 128, ttl: Optional[float] = None, name: str = "cache"):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.name = name
+        self._data: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                expires_at, value = entry
+                if expires_at is None or expires_at > time.monotonic():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_set(self, key: Hashable, compute: Callable[[], Any], ttl: Optional[float] = None) -> Any:
+        """Return the cached value, computing and storing it on a miss"""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.set(key, value, ttl)
+        return value
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._data)
+        lookups = self.hits + self.misses
+        return {
+            'name': self.name,
+            'size': size,
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+
+class TableVersions:
+    """Per-table write counters, stored in the cache_versions table.
+
+    Cache keys that include the versions of the tables a result was read from
+    stop matching as soon as one of those tables is written, so stale entries
+    are never served and simply age out of the LRU. Versions live in the
+    database, so a write committed by any process (the app, the API, job
+    workers, other replicas) is seen by every process's caches.
+    """
+
+    def bump(self, *tables: str) -> None:
+        """Increment table versions; call it after the write has committed.
+
+        The bump is its own short transaction so writers hold the version row
+        locks for one UPDATE, not for their whole transaction. If the process
+        dies between the two commits, the cache TTL bounds the staleness.
+        """
+        from sqlalchemy import update
+        from database import CacheVersion, engine
+        with engine.begin() as connection:
+            # A fixed order keeps concurrent bumps from deadlocking
+            for table in sorted(set(tables)):
+                connection.execute(
+                    update(CacheVersion).where(CacheVersion.name == table)
+                    .values(version=CacheVersion.version + 1)
+                )
+
+    def snapshot(self, db, *tables: str) -> tuple:
+        from sqlalchemy import select
+        from database import CacheVersion
+        versions = dict(db.execute(
+            select(CacheVersion.name, CacheVersion.version).where(CacheVersion.name.in_(tables))
+        ).all())
+        return tuple(versions.get(table, 0) for table in tables)
+
+
+# Tables with a row in cache_versions
+VERSIONED_TABLES = ("workshops", "registrations")
+
+table_versions = TableVersions()
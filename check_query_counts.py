@@ -0,0 +1,134 @@
+"""Check that the registration list reads issue a constant number of queries.
+
+Seeds a throwaway database in rounds, growing the number of users, workshops
+and registrations each round, and counts the statements each
+WorkshopManager registration read executes. Exits non-zero if any read's
+statement count changes as the rows grow, which is how an N+1 (a lazy load
+per registration, user or workshop) shows up.
+
+    python check_query_counts.py                       # temporary SQLite file
+    python check_query_counts.py --rounds 4 --step 50
+    python check_query_counts.py --database-url postgresql://...  # use a scratch database
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Check query counts of the registration list reads")
+    parser.add_argument("--database-url", help="Database to run against (defaults to a temporary SQLite file)")
+    parser.add_argument("--rounds", type=int, default=3, help="Times to grow the data and re-count")
+    parser.add_argument("--step", type=int, default=20, help="Users and workshops added per round")
+    parser.add_argument("--verbose", action="store_true", help="print every statement")
+    return parser.parse_args()
+
+
+args = parse_args()
+os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'counts.db')}"
+
+# The engine is configured from the environment at import time
+from sqlalchemy import event
+from database import SessionLocal, Registration, User, Workshop, bootstrap, engine
+from workshop_manager import WorkshopManager
+
+STATUSES = ("pending", "confirmed", "rejected")
+
+
+def count_statements(callable_):
+    """Run callable_ and return the statements it executed"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        callable_()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+def grow(organizer_id: int, attendee_id: int, round_number: int):
+    """Add args.step users and workshops; every new user registers for every new workshop"""
+    db = SessionLocal()
+    try:
+        users = [User(name=f"Attendee {round_number}-{i}", email=f"attendee-{round_number}-{i}@example.com",
+                      password_hash="-", role="user") for i in range(args.step)]
+        workshops = [Workshop(
+            title=f"Count workshop {round_number}-{i}", description="Query count workshop", organizer="Count Org",
+            organizer_user_id=organizer_id, instructor="Instructor", date=datetime(2030, 1, 1) + timedelta(days=i),
+            time="10:00 AM", location="Hall", city="Pune", category="Technology", level="Beginner",
+            duration="2 hours", price=0.0, max_seats=1000, available_seats=1000, mode="manual"
+        ) for i in range(args.step)]
+        db.add_all(users + workshops)
+        db.flush()
+        registrations = [
+            Registration(user_id=user.id, workshop_id=workshop.id, registration_type="manual",
+                         status=STATUSES[(i + j) % len(STATUSES)], notes="Looking forward to it")
+            for i, user in enumerate(users) for j, workshop in enumerate(workshops)
+        ]
+        # The attendee whose own list is read grows with the catalog too
+        registrations += [Registration(user_id=attendee_id, workshop_id=workshop.id, registration_type="manual",
+                                       status="pending") for workshop in workshops]
+        db.add_all(registrations)
+        db.commit()
+    finally:
+        db.close()
+
+
+def main():
+    bootstrap()
+    db = SessionLocal()
+    try:
+        organizer = User(name="Count Org", email="count-org@example.com", password_hash="-", role="enterprise")
+        attendee = User(name="Count Attendee", email="count-attendee@example.com", password_hash="-", role="user")
+        db.add_all([organizer, attendee])
+        db.commit()
+        organizer_id, attendee_id = organizer.id, attendee.id
+    finally:
+        db.close()
+
+    def reads(wm):
+        # Each read touches the user and workshop of every registration it returns
+        def touching(rows):
+            return lambda: [(row.user and row.user.email, row.workshop and row.workshop.title) for row in rows()]
+        return [
+            ("pending registrations", touching(lambda: wm.get_pending_registrations())),
+            ("pending registrations (summary)", touching(lambda: wm.get_pending_registrations(summary=True))),
+            ("recent registrations", touching(lambda: wm.get_recent_registrations(limit=1000))),
+            ("enterprise registrations", touching(
+                lambda: wm.get_enterprise_registrations(organizer_id, per_page=1000)["registrations"])),
+            ("user registrations", touching(lambda: wm.get_user_registrations(attendee_id))),
+        ]
+
+    counts = {}
+    for round_number in range(1, args.rounds + 1):
+        grow(organizer_id, attendee_id, round_number)
+        wm = WorkshopManager()
+        try:
+            for label, run in reads(wm):
+                wm.db.rollback()
+                statements = count_statements(run)
+                counts.setdefault(label, []).append(len(statements))
+                if args.verbose:
+                    print(f"-- {label}, round {round_number}")
+                    for statement in statements:
+                        print("    " + statement.strip().replace("\n", "\n    "))
+        finally:
+            wm.close()
+
+    failures = 0
+    for label, per_round in counts.items():
+        constant = len(set(per_round)) == 1
+        if not constant:
+            failures += 1
+        print(f"[{'ok' if constant else 'GROWS'}] {label}: {' -> '.join(map(str, per_round))} statements")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Check that the main WorkshopManager queries are served by indexes.
+
+Runs the hot read paths against the configured DATABASE_URL, captures the SQL
+they issue, and prints the EXPLAIN plan of each statement. Exits non-zero if
+any statement sequentially scans a watched table.
+
+    python check_query_plans.py            # report and fail on table scans
+    python check_query_plans.py --verbose  # also print every plan
+
+On PostgreSQL, sequential scans are disabled for the check so the plan shows
+whether a usable index exists even when the tables are still small. On SQLite,
+run ANALYZE on a populated database first for representative plans.
+"""
+import argparse
+import json
+import re
+import sys
+from sqlalchemy import event
+from database import engine, Workshop, User
+from workshop_manager import WorkshopManager
+
+WATCHED_TABLES = {"workshops", "registrations", "users", "workshop_tags"}
+
+
+def capture_statements(callable_):
+    """Run callable_ and return the (statement, parameters) pairs it executed"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(("SELECT", "WITH")):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        callable_()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+def explain(connection, statement, parameters):
+    """Return (plan text, scanned tables) for a statement"""
+    if connection.dialect.name == "postgresql":
+        plan = connection.exec_driver_sql("EXPLAIN (FORMAT JSON) " + statement, parameters).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        scans = set()
+
+        def walk(node):
+            if node.get("Node Type") == "Seq Scan":
+                scans.add(node.get("Relation Name"))
+            for child in node.get("Plans", []):
+                walk(child)
+
+        walk(plan[0]["Plan"])
+        return json.dumps(plan, indent=2), scans
+
+    if connection.dialect.name == "sqlite":
+        rows = connection.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+        lines = [row[-1] for row in rows]
+        scans = set()
+        for line in lines:
+            # "SCAN workshops" is a full table scan; "SCAN workshops USING INDEX ..." is not
+            match = re.match(r"SCAN (\w+)(?: AS \w+)?$", line)
+            if match:
+                scans.add(match.group(1))
+        return "\n".join(lines), scans
+
+    raise SystemExit(f"Unsupported database: {connection.dialect.name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check EXPLAIN plans of the main queries")
+    parser.add_argument("--verbose", action="store_true", help="print every plan")
+    args = parser.parse_args()
+
+    wm = WorkshopManager()
+    try:
+        # Sample ids from the data; placeholders still produce representative plans on an empty database
+        organizer_id = wm.db.query(Workshop.organizer_user_id).limit(1).scalar() or 1
+        user_id = wm.db.query(User.id).limit(1).scalar() or 1
+
+        checks = [
+            ("browse (default)", lambda: wm.get_workshops({}, count=None)),
+            ("browse (filtered)", lambda: wm.get_workshops(
+                {'status': 'active', 'category': 'Technology', 'city': 'Mumbai', 'sort_by': 'date'}, count=None)),
+            ("browse (search)", lambda: wm.get_workshops({'search': 'python'}, count=None)),
+            ("browse (tags)", lambda: wm.get_workshops({'tags': ['python', 'ai']}, count=None)),
+            # The first browse page estimates its total with EXPLAIN on PostgreSQL
+            ("browse (tags, estimated total)", lambda: wm.get_workshops({'tags': ['python', 'ai']}, count='estimate')),
+            ("organizer workshops", lambda: wm.get_workshops({'organizer_user_id': organizer_id}, count=None)),
+            ("pending approvals", lambda: wm.get_pending_registrations(limit=50)),
+            ("recent registrations", lambda: wm.get_recent_registrations(limit=50)),
+            ("user registrations", lambda: wm.get_user_registrations(user_id)),
+            ("enterprise registrations", lambda: wm.get_enterprise_registrations(organizer_id, status='pending')),
+        ]
+
+        failures = 0
+        with engine.connect() as connection:
+            if connection.dialect.name == "postgresql":
+                connection.exec_driver_sql("SET enable_seqscan = off")
+            for label, run in checks:
+                wm.db.rollback()
+                for statement, parameters in capture_statements(run):
+                    plan, scans = explain(connection, statement, parameters)
+                    flagged = scans & WATCHED_TABLES
+                    status = "SCAN " + ", ".join(sorted(flagged)) if flagged else "ok"
+                    print(f"[{status}] {label}")
+                    if flagged:
+                        failures += 1
+                    if flagged or args.verbose:
+                        print("    " + statement.strip().replace("\n", "\n    "))
+                        print("    " + plan.replace("\n", "\n    "))
+    finally:
+        wm.close()
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,28 +1,113 @@
 import os
-from sqlalchemy import create_engine, Column, Integer, String, Text, DateTime, Boolean, Float, ForeignKey, Table
+import time
+import threading
+from contextlib import contextmanager
+from sqlalchemy import create_engine, event, Column, Integer, String, Text, DateTime, Boolean, Float, ForeignKey, Table, Index, JSON
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import sessionmaker, relationship, scoped_session, deferred
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.sql import func
 from datetime import datetime, timezone
-import bcrypt
+import passwords
 
 # Database setup with connection pooling and retry logic
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://localhost/workshop_platform")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+
+def _connect_args(url: str) -> dict:
+    """Driver arguments for the configured backend"""
+    if url.startswith("postgresql"):
+        return {"sslmode": "prefer"}
+    if url.startswith("sqlite"):
+        # Local stand-in: wait on the database lock instead of failing immediately
+        return {"timeout": 30}
+    return {}
+
+# Pool counters, updated by InstrumentedQueuePool and the pool events below
+_pool_stats_lock = threading.Lock()
+_pool_stats = {
+    'checkouts': 0,
+    'connects': 0,
+    'invalidations': 0,
+    'timeouts': 0,
+    'wait_seconds_total': 0.0,
+    'wait_seconds_max': 0.0
+}
+
+def _record_pool_stat(name: str, value=1):
+    with _pool_stats_lock:
+        _pool_stats[name] += value
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait for a connection"""
+    
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            _record_pool_stat('timeouts')
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            with _pool_stats_lock:
+                _pool_stats['wait_seconds_total'] += waited
+                _pool_stats['wait_seconds_max'] = max(_pool_stats['wait_seconds_max'], waited)
+
+def _pool_args(url: str) -> dict:
+    """Pool sizing for the configured backend; in-memory SQLite keeps its default pool"""
+    if url.startswith("sqlite") and (url in ("sqlite://", "sqlite:///") or ":memory:" in url):
+        return {}
+    return {
+        'poolclass': InstrumentedQueuePool,
+        'pool_size': DB_POOL_SIZE,
+        'max_overflow': DB_MAX_OVERFLOW,
+        'pool_timeout': DB_POOL_TIMEOUT
+    }
+
 engine = create_engine(
     DATABASE_URL,
     pool_pre_ping=True,
     pool_recycle=300,
-    connect_args={"sslmode": "prefer"}
+    connect_args=_connect_args(DATABASE_URL),
+    **_pool_args(DATABASE_URL)
 )
+
+@event.listens_for(engine, "checkout")
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    _record_pool_stat('checkouts')
+
+@event.listens_for(engine, "connect")
+def _on_connect(dbapi_connection, connection_record):
+    _record_pool_stat('connects')
+
+@event.listens_for(engine, "invalidate")
+def _on_invalidate(dbapi_connection, connection_record, exception):
+    _record_pool_stat('invalidations')
+
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Thread-local session for one Streamlit script run. The app takes it at the
+# start of a run and calls ScopedSession.remove() when the run ends.
+ScopedSession = scoped_session(SessionLocal)
+
 Base = declarative_base()
 
+# JSON list columns: native JSONB on PostgreSQL, JSON-encoded text on SQLite
+DetailList = JSON().with_variant(JSONB(), "postgresql")
+
 # Association table for workshop tags
 workshop_tags = Table(
     'workshop_tags',
     Base.metadata,
     Column('workshop_id', Integer, ForeignKey('workshops.id'), primary_key=True),
-    Column('tag_id', Integer, ForeignKey('tags.id'), primary_key=True)
+    Column('tag_id', Integer, ForeignKey('tags.id'), primary_key=True),
+    # The primary key leads with workshop_id; tag filters need tag_id first
+    Index("ix_workshop_tags_tag_workshop", "tag_id", "workshop_id")
 )
 
 class User(Base):
@@ -43,11 +128,11 @@ class User(Base):
     organized_workshops = relationship("Workshop", back_populates="organizer_user")
     
     def verify_password(self, password: str) -> bool:
-        return bcrypt.checkpw(password.encode('utf-8'), self.password_hash.encode('utf-8'))
+        return passwords.verify_password(password, self.password_hash)
     
     @staticmethod
     def hash_password(password: str) -> str:
-        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        return passwords.hash_password(password)
 
 class Workshop(Base):
     __tablename__ = "workshops"
@@ -56,7 +141,7 @@ class Workshop(Base):
     title = Column(String(200), nullable=False)
     description = Column(Text, nullable=True)
     organizer = Column(String(100), nullable=False)
-    organizer_user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    organizer_user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
     instructor = Column(String(100), nullable=False)
     date = Column(DateTime(timezone=True), nullable=False)
     time = Column(String(20), nullable=False)
@@ -69,13 +154,19 @@ class Workshop(Base):
     organizer_upi_id = Column(String(100), nullable=True)  # UPI ID for payments
     max_seats = Column(Integer, nullable=False)
     available_seats = Column(Integer, nullable=False)
+    # Registration tallies, maintained by WorkshopManager status transitions
+    confirmed_count = Column(Integer, nullable=False, default=0, server_default="0")
+    pending_count = Column(Integer, nullable=False, default=0, server_default="0")  # pending + payment_pending
+    rejected_count = Column(Integer, nullable=False, default=0, server_default="0")
     mode = Column(String(20), default="manual")  # manual, automated
     status = Column(String(20), default="active")  # active, cancelled, completed
     featured = Column(Boolean, default=False)
     image_url = Column(String(500), nullable=True)
-    prerequisites = Column(Text, nullable=True)  # JSON string
-    what_you_learn = Column(Text, nullable=True)  # JSON string
-    agenda = Column(Text, nullable=True)  # JSON string
+    # Detail lists, stored as JSONB on PostgreSQL (JSON text elsewhere). Deferred:
+    # they load together, and are decoded once, on first access of any of them
+    prerequisites = deferred(Column(DetailList, nullable=True), group="details")
+    what_you_learn = deferred(Column(DetailList, nullable=True), group="details")
+    agenda = deferred(Column(DetailList, nullable=True), group="details")
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
@@ -83,6 +174,14 @@ class Workshop(Base):
     organizer_user = relationship("User", back_populates="organized_workshops")
     registrations = relationship("Registration", back_populates="workshop", cascade="all, delete-orphan")
     tags = relationship("Tag", secondary=workshop_tags, back_populates="workshops")
+    
+    __table_args__ = (
+        # Catalog filters (status, category, city) with date ordering
+        Index("ix_workshops_status_category_city_date", "status", "category", "city", "date"),
+        # Keyset pagination for the newest-first and by-date orderings
+        Index("ix_workshops_created_at_id", "created_at", "id"),
+        Index("ix_workshops_date_id", "date", "id"),
+    )
 
 class Tag(Base):
     __tablename__ = "tags"
@@ -116,6 +215,45 @@ class Registration(Base):
     # Relationships
     user = relationship("User", back_populates="registrations")
     workshop = relationship("Workshop", back_populates="registrations")
+    
+    __table_args__ = (
+        # Per-workshop status filters and newest-first listings for organizers
+        Index("ix_registrations_workshop_status_registered", "workshop_id", "status", "registered_at"),
+        # Duplicate-registration check and per-user listings
+        Index("ix_registrations_user_workshop", "user_id", "workshop_id"),
+        # Pending approval queue
+        Index("ix_registrations_status_registered", "status", "registered_at"),
+        # Newest-first registration listings
+        Index("ix_registrations_registered_at", "registered_at"),
+    )
+
+class Job(Base):
+    __tablename__ = "jobs"
+    
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(50), nullable=False)
+    payload = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=False)
+    status = Column(String(20), nullable=False, default="queued")  # queued, running, done, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    # Queued: earliest time to run. Running: lease expiry, after which another worker may reclaim it
+    available_at = Column(DateTime(timezone=True), nullable=False)
+    locked_by = Column(String(100), nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    
+    __table_args__ = (
+        # Claim scan: runnable jobs in availability order
+        Index("ix_jobs_status_available", "status", "available_at"),
+    )
+
+class CacheVersion(Base):
+    __tablename__ = "cache_versions"
+    
+    # One row per table whose writes invalidate shared read caches (see cache.TableVersions)
+    name = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
 
 # Database functions
 def get_db():
@@ -125,26 +263,58 @@ def get_db():
     finally:
         db.close()
 
-def create_tables():
-    """Create database tables with retry logic"""
+@contextmanager
+def session_scope():
+    """Short-lived session for a single unit of work, always closed on exit"""
+    db = SessionLocal()
     try:
-        Base.metadata.create_all(bind=engine)
-        print("Database tables created successfully!")
+        yield db
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+def get_pool_stats() -> dict:
+    """Live connection pool statistics"""
+    pool = engine.pool
+    with _pool_stats_lock:
+        stats = dict(_pool_stats)
+    stats['avg_wait_ms'] = 1000 * stats['wait_seconds_total'] / stats['checkouts'] if stats['checkouts'] else 0.0
+    stats['max_wait_ms'] = 1000 * stats['wait_seconds_max']
+    if isinstance(pool, QueuePool):
+        stats.update({
+            'pool_size': pool.size(),
+            'max_overflow': DB_MAX_OVERFLOW,
+            'checked_out': pool.checkedout(),
+            'checked_in': pool.checkedin(),
+            'overflow': max(0, pool.overflow())
+        })
+    return stats
+
+def create_tables() -> bool:
+    """Bring the database schema up to date with retry logic"""
+    from migrations import run_migrations
+    try:
+        applied = run_migrations(engine)
+        print(f"Database schema up to date ({len(applied)} migrations applied)")
+        return True
     except Exception as e:
-        print(f"Error creating tables: {e}")
-        # Try to reconnect and create again
+        print(f"Error migrating database: {e}")
+        # Try to reconnect and migrate again
         try:
             engine.dispose()
-            Base.metadata.create_all(bind=engine)
-            print("Database tables created on retry!")
+            applied = run_migrations(engine)
+            print(f"Database schema up to date on retry ({len(applied)} migrations applied)")
+            return True
         except Exception as e2:
-            print(f"Failed to create tables after retry: {e2}")
+            print(f"Failed to migrate database after retry: {e2}")
+            return False
 
-def init_admin_user():
+def init_admin_user() -> bool:
     """Create default admin user if not exists"""
     try:
-        db = SessionLocal()
-        try:
+        with session_scope() as db:
             admin = db.query(User).filter(User.email == "admin@workshop.com").first()
             if not admin:
                 admin = User(
@@ -157,12 +327,30 @@ def init_admin_user():
                 db.add(admin)
                 db.commit()
                 print("Default admin user created: admin@workshop.com / admin123")
-        finally:
-            db.close()
+        return True
     except Exception as e:
         print(f"Error creating admin user: {e}")
+        return False
+
+# Schema migration and seeding run once per process, not on every Streamlit
+# rerun. Set AUTO_BOOTSTRAP=0 when deployments run `python database.py` instead.
+AUTO_BOOTSTRAP = os.getenv("AUTO_BOOTSTRAP", "1").lower() not in ("0", "false", "no")
+_bootstrap_lock = threading.Lock()
+_bootstrapped = False
+
+def bootstrap() -> bool:
+    """Migrate the schema and seed the admin user, once per process"""
+    global _bootstrapped
+    if _bootstrapped:
+        return True
+    with _bootstrap_lock:
+        # A failed attempt is retried by the next caller
+        if not _bootstrapped:
+            _bootstrapped = create_tables() and init_admin_user()
+    return _bootstrapped
 
 if __name__ == "__main__":
-    create_tables()
-    init_admin_user()
-    print("Database tables created successfully!")
\ No newline at end of file
+    if bootstrap():
+        print("Database tables created successfully!")
+    else:
+        raise SystemExit(1)
@@ -1,30 +1,218 @@
 import streamlit as st
 import os
 import uuid
-from PIL import Image
-import base64
+import time
+import threading
+from PIL import Image, ImageOps
 from io import BytesIO
+import blob_store
+
+# Image pipeline limits. Uploads are checked against the byte and pixel limits
+# before any pixel data is decoded, so a single request cannot exhaust memory.
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", 15 * 1024 * 1024))
+MAX_IMAGE_PIXELS = int(os.getenv("MAX_IMAGE_PIXELS", 50_000_000))
+MAX_IMAGE_DIMENSION = int(os.getenv("MAX_IMAGE_DIMENSION", 1600))
+IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "WEBP").upper()  # WEBP or JPEG
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", 80))
+THUMBNAIL_SIZES = {"thumb": 320}
+
+# PIL's own decompression bomb check, as a backstop to the explicit one below
+Image.MAX_IMAGE_PIXELS = MAX_IMAGE_PIXELS
+
+_EXTENSIONS = {"WEBP": "webp", "JPEG": "jpg"}
+
+class ImageRejected(ValueError):
+    """Raised when an upload is too large, not an image, or a decompression bomb"""
+
+_metrics_lock = threading.Lock()
+_metrics = {
+    "images_processed": 0,
+    "images_rejected": 0,
+    "bytes_in": 0,
+    "bytes_out": 0,
+    "process_seconds": 0.0,
+    "thumbnails_generated": 0,
+    "thumbnail_cache_hits": 0,
+    "thumbnail_seconds": 0.0,
+}
+
+def _record(**values):
+    with _metrics_lock:
+        for name, value in values.items():
+            _metrics[name] += value
+
+def get_image_metrics() -> dict:
+    """Snapshot of image pipeline counters, with average timings"""
+    with _metrics_lock:
+        snapshot = dict(_metrics)
+    processed = snapshot["images_processed"]
+    generated = snapshot["thumbnails_generated"]
+    snapshot["avg_process_ms"] = 1000 * snapshot["process_seconds"] / processed if processed else 0.0
+    snapshot["avg_thumbnail_ms"] = 1000 * snapshot["thumbnail_seconds"] / generated if generated else 0.0
+    snapshot["compression_ratio"] = snapshot["bytes_out"] / snapshot["bytes_in"] if snapshot["bytes_in"] else 0.0
+    return snapshot
+
+def _open_bounded(source, max_dimension: int) -> Image.Image:
+    """Open an image and decode it no larger than needed for max_dimension.
+
+    Only the header is read to check the pixel count. For JPEG, draft() then
+    lets the decoder scale down by up to 8x while decoding, so a 12 MP photo
+    is never materialized at full resolution.
+    """
+    try:
+        image = Image.open(source)
+    except (Image.DecompressionBombError, Image.DecompressionBombWarning) as e:
+        raise ImageRejected(str(e))
+    except Exception:
+        raise ImageRejected("File is not a supported image")
+
+    width, height = image.size
+    if width * height > MAX_IMAGE_PIXELS:
+        raise ImageRejected(f"Image is too large ({width}x{height} pixels)")
+
+    image.draft("RGB", (max_dimension, max_dimension))
+    try:
+        image = ImageOps.exif_transpose(image)
+    except Exception:
+        pass
+    image.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+    return image
+
+def _encode(image: Image.Image, image_format: str, quality: int) -> bytes:
+    if image_format == "JPEG" and image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    elif image_format == "WEBP" and image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "A" in image.getbands() else "RGB")
+    output = BytesIO()
+    image.save(output, format=image_format, quality=quality, optimize=image_format == "JPEG")
+    return output.getvalue()
+
+def process_image(source, max_dimension: int = MAX_IMAGE_DIMENSION,
+                  image_format: str = IMAGE_FORMAT, quality: int = IMAGE_QUALITY) -> tuple[bytes, str]:
+    """Downscale and transcode an image; returns (encoded bytes, file extension)"""
+    if image_format not in _EXTENSIONS:
+        raise ValueError(f"Unsupported output format: {image_format}")
+
+    started = time.perf_counter()
+    source.seek(0, os.SEEK_END)
+    size = source.tell()
+    source.seek(0)
+    if size > MAX_UPLOAD_BYTES:
+        _record(images_rejected=1)
+        raise ImageRejected(f"File is too large ({size / 1024 / 1024:.1f} MB)")
+
+    try:
+        with _open_bounded(source, max_dimension) as image:
+            data = _encode(image, image_format, quality)
+    except ImageRejected:
+        _record(images_rejected=1)
+        raise
+
+    _record(images_processed=1, bytes_in=size, bytes_out=len(data),
+            process_seconds=time.perf_counter() - started)
+    return data, _EXTENSIONS[image_format]
+
+def check_image(source) -> str:
+    """Cheap upload check from the size and header only; returns the file extension"""
+    source.seek(0, os.SEEK_END)
+    size = source.tell()
+    source.seek(0)
+    if size > MAX_UPLOAD_BYTES:
+        _record(images_rejected=1)
+        raise ImageRejected(f"File is too large ({size / 1024 / 1024:.1f} MB)")
+    try:
+        with Image.open(source) as image:
+            width, height = image.size
+            image_format = image.format or "bin"
+    except Exception:
+        _record(images_rejected=1)
+        raise ImageRejected("File is not a supported image")
+    finally:
+        source.seek(0)
+    if width * height > MAX_IMAGE_PIXELS:
+        _record(images_rejected=1)
+        raise ImageRejected(f"Image is too large ({width}x{height} pixels)")
+    return image_format.lower()
+
+def store_image_upload(uploaded_file):
+    """Check and store an upload as-is; a background job downscales it later.
+    
+    Returns its blob key, or None after showing the error.
+    """
+    try:
+        extension = check_image(uploaded_file)
+        return blob_store.put_stream(uploaded_file, extension)
+    except ImageRejected as e:
+        st.error(f"Image rejected: {str(e)}")
+        return None
+    except Exception as e:
+        st.error(f"Error saving image: {str(e)}")
+        return None
+
+def process_stored_image(key: str) -> str:
+    """Downscale and transcode a stored upload, warm its thumbnail; returns the new key"""
+    with blob_store.open_blob(key) as source:
+        data, extension = process_image(source)
+    processed_key = blob_store.put_bytes(data, extension)
+    get_thumbnail(processed_key)
+    return processed_key
+
+def get_thumbnail(key: str, variant: str = "thumb") -> bytes:
+    """Thumbnail bytes for a stored image, generated once and cached next to it"""
+    extension = _EXTENSIONS[IMAGE_FORMAT]
+    cached = blob_store.read_variant(key, variant, extension)
+    if cached is not None:
+        _record(thumbnail_cache_hits=1)
+        return cached
+
+    started = time.perf_counter()
+    with blob_store.open_blob(key) as source:
+        with _open_bounded(source, THUMBNAIL_SIZES[variant]) as image:
+            data = _encode(image, IMAGE_FORMAT, IMAGE_QUALITY)
+    blob_store.put_variant(key, variant, extension, data)
+    _record(thumbnails_generated=1, thumbnail_seconds=time.perf_counter() - started)
+    return data
 
 def save_uploaded_file(uploaded_file, folder="uploads"):
     """Save uploaded file and return the file path"""
     try:
         # Create uploads directory if it doesn't exist
         os.makedirs(folder, exist_ok=True)
-        
+
         # Generate unique filename
         file_extension = uploaded_file.name.split('.')[-1]
         unique_filename = f"{uuid.uuid4()}.{file_extension}"
         file_path = os.path.join(folder, unique_filename)
-        
+
         # Save file
         with open(file_path, "wb") as f:
             f.write(uploaded_file.getbuffer())
-        
+
         return file_path
     except Exception as e:
         st.error(f"Error saving file: {str(e)}")
         return None
 
+def display_stored_image(reference, max_width=300, thumbnail=False):
+    """Display an image from a blob key, reading it only when called"""
+    try:
+        if blob_store.is_blob_key(reference):
+            if not blob_store.exists(reference):
+                st.error("Image file not found")
+            elif thumbnail:
+                st.image(get_thumbnail(reference), width=max_width)
+            else:
+                st.image(blob_store.read_blob(reference), width=max_width)
+        else:
+            # Rows written before the blob store hold an inline base64 data URI
+            decoded = blob_store.decode_data_uri(reference)
+            if decoded:
+                st.image(decoded[0], width=max_width)
+            else:
+                st.error("Unsupported image reference")
+    except Exception as e:
+        st.error(f"Error displaying image: {str(e)}")
+
 def display_image(file_path, max_width=300):
     """Display image from file path"""
     try:
@@ -35,18 +223,3 @@ def display_image(file_path, max_width=300):
             st.error("Image file not found")
     except Exception as e:
         st.error(f"Error displaying image: {str(e)}")
-
-def encode_image_to_base64(image_file):
-    """Convert uploaded image to base64 string"""
-    try:
-        if image_file is not None:
-            # Convert to base64
-            buffered = BytesIO()
-            image = Image.open(image_file)
-            image.save(buffered, format="PNG")
-            img_str = base64.b64encode(buffered.getvalue()).decode()
-            return f"data:image/png;base64,{img_str}"
-        return None
-    except Exception as e:
-        st.error(f"Error encoding image: {str(e)}")
-        return None
\ No newline at end of file
@@ -0,0 +1,311 @@
+"""Durable background jobs, stored in the jobs table.
+
+Slow side effects (image processing, notifications, counter recounts) are
+enqueued in the same transaction as the write that triggers them and run by
+worker processes, so a request pays only for its critical write.
+
+Workers claim jobs with one UPDATE ... RETURNING over the oldest runnable
+rows. On PostgreSQL the candidate rows are locked FOR UPDATE SKIP LOCKED, so
+concurrent workers never block on or double-claim a job; SQLite serializes
+writers, which makes the same conditional UPDATE atomic there. A claim is a
+lease: available_at moves to now + the visibility timeout, and a job whose
+worker dies becomes claimable again once its lease expires. Failures retry
+with exponential backoff until max_attempts, then stay in the table as
+'failed' for inspection.
+
+    python job_queue.py work --processes 2 --concurrency 4
+    python job_queue.py stats
+    python job_queue.py enqueue reconcile_counters
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Optional
+from sqlalchemy import event, func, insert, select, update
+from sqlalchemy.orm import Session
+from database import Job, Registration, User, Workshop, SessionLocal, engine, session_scope
+
+JOB_VISIBILITY_TIMEOUT = float(os.getenv("JOB_VISIBILITY_TIMEOUT", 300))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 5))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", 10))
+JOB_RETRY_MAX_SECONDS = float(os.getenv("JOB_RETRY_MAX_SECONDS", 3600))
+JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", 1))
+JOB_KEEP_DONE_HOURS = float(os.getenv("JOB_KEEP_DONE_HOURS", 24))
+# Registration events are POSTed here as JSON when set
+NOTIFICATION_WEBHOOK_URL = os.getenv("NOTIFICATION_WEBHOOK_URL")
+NOTIFICATION_TIMEOUT = float(os.getenv("NOTIFICATION_TIMEOUT", 10))
+
+HANDLERS = {}
+
+_metrics_lock = threading.Lock()
+_metrics = {
+    "claimed": 0,
+    "succeeded": 0,
+    "retried": 0,
+    "gave_up": 0,
+    "lost_leases": 0,
+    "run_seconds": 0.0,
+}
+
+
+def handler(kind: str):
+    """Register the function that runs jobs of this kind: func(db, payload)"""
+    def register(func: Callable[[Session, dict], None]):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _record(**values):
+    with _metrics_lock:
+        for name, value in values.items():
+            _metrics[name] += value
+
+
+def enqueue(db: Session, kind: str, payload: Optional[dict] = None, delay: float = 0,
+            max_attempts: int = JOB_MAX_ATTEMPTS) -> None:
+    """Add a job to the caller's transaction; it becomes visible to workers on commit"""
+    now = _now()
+    db.execute(insert(Job).values(
+        kind=kind, payload=payload or {}, status="queued", attempts=0, max_attempts=max_attempts,
+        available_at=now + timedelta(seconds=delay), created_at=now
+    ))
+
+
+def claim(db: Session, worker_id: str, limit: int = 1,
+          visibility_timeout: float = JOB_VISIBILITY_TIMEOUT) -> list:
+    """Lease up to `limit` runnable jobs; returns (id, kind, payload, attempts, max_attempts) rows"""
+    now = _now()
+    # Queued jobs that are due, and running jobs whose lease has expired
+    candidates = select(Job.id).where(
+        Job.status.in_(("queued", "running")),
+        Job.available_at <= now
+    ).order_by(Job.available_at, Job.id).limit(limit).with_for_update(skip_locked=True)
+    rows = db.execute(
+        update(Job)
+        .where(Job.id.in_(candidates.scalar_subquery()))
+        .values(status="running", attempts=Job.attempts + 1, locked_by=worker_id,
+                available_at=now + timedelta(seconds=visibility_timeout))
+        .returning(Job.id, Job.kind, Job.payload, Job.attempts, Job.max_attempts)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+    _record(claimed=len(rows))
+    return rows
+
+
+def _lease(job_id: int, attempts: int):
+    # A lease is one claim of a job; a reclaimed job has a higher attempt number
+    return (Job.id == job_id, Job.status == "running", Job.attempts == attempts)
+
+
+def _retry_delay(attempts: int) -> float:
+    return min(JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1), JOB_RETRY_MAX_SECONDS)
+
+
+def run_job(job_id: int, kind: str, payload: dict, attempts: int, max_attempts: int) -> bool:
+    """Run one claimed job; its effects commit together with marking it done"""
+    started = time.perf_counter()
+    db = SessionLocal()
+    try:
+        try:
+            func = HANDLERS.get(kind)
+            if func is None:
+                raise LookupError(f"No handler for job kind {kind!r}")
+            func(db, payload)
+            done = db.execute(
+                update(Job).where(*_lease(job_id, attempts))
+                .values(status="done", finished_at=_now(), last_error=None)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            if not done:
+                # The lease expired and another worker took the job over; discard this run
+                db.rollback()
+                _record(lost_leases=1)
+                return False
+            db.commit()
+            _record(succeeded=1, run_seconds=time.perf_counter() - started)
+            return True
+        except Exception as e:
+            db.rollback()
+            final = attempts >= max_attempts
+            values = {"last_error": f"{type(e).__name__}: {e}"[:2000]}
+            if final:
+                values.update(status="failed", finished_at=_now())
+            else:
+                values.update(status="queued", available_at=_now() + timedelta(seconds=_retry_delay(attempts)))
+            db.execute(update(Job).where(*_lease(job_id, attempts)).values(**values)
+                       .execution_options(synchronize_session=False))
+            db.commit()
+            if final:
+                _record(gave_up=1)
+            else:
+                _record(retried=1)
+            return False
+    finally:
+        db.close()
+
+
+def work(worker_id: Optional[str] = None, concurrency: int = 1, once: bool = False,
+         stop: Optional[threading.Event] = None) -> int:
+    """Claim and run jobs until stopped (or, with once, until the queue is drained); returns jobs run"""
+    worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+    stop = stop or threading.Event()
+    processed = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        while not stop.is_set():
+            db = SessionLocal()
+            try:
+                jobs = claim(db, worker_id, limit=concurrency)
+            finally:
+                db.close()
+            if not jobs:
+                if once:
+                    break
+                stop.wait(JOB_POLL_SECONDS)
+                continue
+            list(pool.map(lambda job: run_job(*job), jobs))
+            processed += len(jobs)
+    return processed
+
+
+def purge_finished(older_than_hours: float = JOB_KEEP_DONE_HOURS) -> int:
+    """Delete completed jobs older than the retention window; failed jobs are kept"""
+    with session_scope() as db:
+        deleted = db.query(Job).filter(
+            Job.status == "done",
+            Job.finished_at < _now() - timedelta(hours=older_than_hours)
+        ).delete(synchronize_session=False)
+        db.commit()
+        return deleted
+
+
+def get_job_metrics() -> dict:
+    """Queue depth by status and oldest runnable job age, plus this process's worker counters"""
+    with _metrics_lock:
+        snapshot = dict(_metrics)
+    succeeded = snapshot["succeeded"]
+    snapshot["avg_run_ms"] = 1000 * snapshot["run_seconds"] / succeeded if succeeded else 0.0
+    with session_scope() as db:
+        counts = dict(db.query(Job.status, func.count(Job.id)).group_by(Job.status).all())
+        oldest = db.query(func.min(Job.available_at)).filter(
+            Job.status == "queued", Job.available_at <= _now()
+        ).scalar()
+    for status in ("queued", "running", "done", "failed"):
+        snapshot[status] = counts.get(status, 0)
+    if oldest is not None and oldest.tzinfo is None:
+        # SQLite hands back naive datetimes; they were stored as UTC
+        oldest = oldest.replace(tzinfo=timezone.utc)
+    snapshot["oldest_queued_seconds"] = max(0.0, (_now() - oldest).total_seconds()) if oldest else 0.0
+    return snapshot
+
+
+@handler("process_screenshot")
+def _process_screenshot(db: Session, payload: dict):
+    """Downscale a raw payment screenshot upload and point its registration at the result"""
+    from file_handler import ImageRejected, process_stored_image
+    try:
+        processed_key = process_stored_image(payload["key"])
+    except ImageRejected as e:
+        # Retrying cannot help; the registration keeps the original upload
+        print(f"Screenshot for registration {payload['registration_id']} left unprocessed: {e}")
+        return
+    # Only swap the reference if the registration still points at the raw upload
+    db.execute(
+        update(Registration)
+        .where(Registration.id == payload["registration_id"],
+               Registration.payment_screenshot_url == payload["key"])
+        .values(payment_screenshot_url=processed_key)
+        .execution_options(synchronize_session=False)
+    )
+
+
+@handler("registration_event")
+def _registration_event(db: Session, payload: dict):
+    """POST a registration event to NOTIFICATION_WEBHOOK_URL, if one is configured"""
+    if not NOTIFICATION_WEBHOOK_URL:
+        return
+    import requests
+    row = db.query(
+        Registration.id, Registration.status, Registration.registered_at, Registration.confirmed_at,
+        User.name, User.email, Workshop.id, Workshop.title, Workshop.date
+    ).join(User, Registration.user_id == User.id).join(
+        Workshop, Registration.workshop_id == Workshop.id
+    ).filter(Registration.id == payload["registration_id"]).first()
+    if row is None:
+        return
+    event = {
+        "event": payload["event"],
+        "registration": {"id": row[0], "status": row[1], "registered_at": _iso(row[2]), "confirmed_at": _iso(row[3])},
+        "user": {"name": row[4], "email": row[5]},
+        "workshop": {"id": row[6], "title": row[7], "date": _iso(row[8])},
+    }
+    requests.post(NOTIFICATION_WEBHOOK_URL, json=event, timeout=NOTIFICATION_TIMEOUT).raise_for_status()
+
+
+@handler("reconcile_counters")
+def _reconcile_counters(db: Session, payload: dict):
+    """Recount workshop registration counters and seats"""
+    from cache import table_versions
+    from registration_counters import reconcile
+    corrected = reconcile(db.connection())
+    if corrected:
+        # run_job commits the recount; bump the version only once it is visible
+        event.listen(db, "after_commit", lambda session: table_versions.bump("workshops"), once=True)
+    print(f"Reconciled registration counters on {corrected} workshops")
+
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+
+def _work_process(concurrency: int, once: bool):
+    # Forked workers must not share the parent's pooled connections
+    engine.dispose(close=False)
+    work(concurrency=concurrency, once=once)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Background job queue")
+    commands = parser.add_subparsers(dest="command", required=True)
+    work_parser = commands.add_parser("work", help="run worker processes")
+    work_parser.add_argument("--processes", type=int, default=1)
+    work_parser.add_argument("--concurrency", type=int, default=2, help="jobs run at once per process")
+    work_parser.add_argument("--once", action="store_true", help="exit when no job is runnable")
+    commands.add_parser("stats", help="print queue metrics")
+    commands.add_parser("purge", help="delete completed jobs past JOB_KEEP_DONE_HOURS")
+    enqueue_parser = commands.add_parser("enqueue", help="queue a job by hand")
+    enqueue_parser.add_argument("kind", choices=sorted(HANDLERS))
+    enqueue_parser.add_argument("payload", nargs="?", default="{}", help="JSON object")
+    args = parser.parse_args()
+
+    if args.command == "work":
+        if args.processes == 1:
+            print(f"Processed {work(concurrency=args.concurrency, once=args.once)} jobs")
+        else:
+            workers = [multiprocessing.Process(target=_work_process, args=(args.concurrency, args.once))
+                       for _ in range(args.processes)]
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+    elif args.command == "stats":
+        for name, value in get_job_metrics().items():
+            print(f"{name:>22}: {value:.1f}" if isinstance(value, float) else f"{name:>22}: {value}")
+    elif args.command == "purge":
+        print(f"Deleted {purge_finished()} completed jobs")
+    else:
+        with session_scope() as db:
+            enqueue(db, args.kind, json.loads(args.payload))
+            db.commit()
+        print(f"Queued {args.kind}")
@@ -0,0 +1,212 @@
+from datetime import datetime, timezone
+from typing import Callable, List
+from sqlalchemy import Column, Integer, String, DateTime, Table, MetaData, inspect, select, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.schema import CreateIndex
+from database import Base, engine as default_engine
+
+# Versioned schema migrations.
+#
+# Each migration runs once per database and is recorded in schema_migrations.
+# Migrations must be idempotent (a fresh database gets the whole current model
+# from the baseline) and safe to run while the app is serving traffic:
+# indexes are built with CREATE INDEX CONCURRENTLY on PostgreSQL, outside a
+# transaction, so writes to the table are not blocked while they build.
+
+MIGRATIONS = []
+
+_migrations_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _migrations_metadata,
+    Column("version", Integer, primary_key=True),
+    Column("description", String(200), nullable=False),
+    Column("applied_at", DateTime(timezone=True), nullable=False),
+)
+
+# Arbitrary key for pg_advisory_lock, so only one process migrates at a time
+_ADVISORY_LOCK_KEY = 72_430_011
+
+# Workshops recounted per transaction when backfilling registration counters
+COUNTER_BACKFILL_BATCH = 1000
+
+
+def migration(version: int, description: str, transactional: bool = True):
+    """Register a migration. Non-transactional migrations run in autocommit mode."""
+    def register(func: Callable[[Connection], None]):
+        MIGRATIONS.append((version, description, transactional, func))
+        MIGRATIONS.sort(key=lambda entry: entry[0])
+        return func
+    return register
+
+
+def create_index(connection: Connection, index_name: str) -> None:
+    """Create a model-declared index if it is missing, without blocking writes on PostgreSQL"""
+    index = next(
+        index for table in Base.metadata.sorted_tables for index in table.indexes if index.name == index_name
+    )
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        # A failed CONCURRENTLY build leaves an INVALID index behind; drop it and rebuild
+        invalid = connection.execute(text(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+            "WHERE c.relname = :name AND NOT i.indisvalid"
+        ), {"name": index_name}).first()
+        if invalid:
+            connection.execute(text(f'DROP INDEX CONCURRENTLY IF EXISTS "{index_name}"'))
+        ddl = str(CreateIndex(index, if_not_exists=True).compile(dialect=connection.dialect))
+        connection.execute(text(ddl.replace("CREATE INDEX", "CREATE INDEX CONCURRENTLY", 1)))
+    else:
+        index.create(bind=connection, checkfirst=True)
+
+
+def add_column(connection: Connection, table_name: str, column_ddl: str) -> None:
+    """Add a column if it does not exist yet; column_ddl is '<name> <type> [constraints]'"""
+    column_name = column_ddl.split()[0]
+    existing = {column["name"] for column in inspect(connection).get_columns(table_name)}
+    if column_name not in existing:
+        connection.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {column_ddl}"))
+
+
+def applied_versions(connection: Connection) -> set:
+    _migrations_metadata.create_all(bind=connection)
+    return set(connection.execute(select(schema_migrations.c.version)).scalars())
+
+
+def run_migrations(engine: Engine = default_engine) -> List[int]:
+    """Apply pending migrations in version order; returns the versions applied"""
+    applied = []
+    with engine.connect() as lock_connection:
+        is_postgres = lock_connection.dialect.name == "postgresql"
+        if is_postgres:
+            lock_connection.execute(text("SELECT pg_advisory_lock(:key)"), {"key": _ADVISORY_LOCK_KEY})
+            lock_connection.commit()
+        try:
+            with engine.begin() as connection:
+                done = applied_versions(connection)
+
+            for version, description, transactional, func in MIGRATIONS:
+                if version in done:
+                    continue
+                if transactional:
+                    with engine.begin() as connection:
+                        func(connection)
+                        _record(connection, version, description)
+                else:
+                    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+                        func(connection)
+                    with engine.begin() as connection:
+                        _record(connection, version, description)
+                print(f"Applied migration {version}: {description}")
+                applied.append(version)
+        finally:
+            if is_postgres:
+                lock_connection.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": _ADVISORY_LOCK_KEY})
+                lock_connection.commit()
+    return applied
+
+
+def _record(connection: Connection, version: int, description: str) -> None:
+    connection.execute(schema_migrations.insert().values(
+        version=version, description=description, applied_at=datetime.now(timezone.utc)
+    ))
+
+
+@migration(1, "Baseline schema")
+def _baseline(connection):
+    # Creates any missing tables with the current model; existing tables are left alone
+    Base.metadata.create_all(bind=connection)
+
+
+@migration(2, "Full-text search index on workshops")
+def _search_index(connection):
+    # On PostgreSQL adding the generated tsvector column rewrites workshops once;
+    # run this migration outside peak hours on large catalogs
+    from search_index import install_search_index
+    install_search_index(connection)
+
+
+@migration(3, "Composite indexes for catalog, approval queue and organizer queries", transactional=False)
+def _hot_path_indexes(connection):
+    for index_name in [
+        "ix_workshops_organizer_user_id",
+        "ix_workshops_status_category_city_date",
+        "ix_workshops_created_at_id",
+        "ix_workshops_date_id",
+        "ix_registrations_workshop_status_registered",
+        "ix_registrations_user_workshop",
+        "ix_registrations_status_registered",
+        "ix_registrations_registered_at",
+    ]:
+        create_index(connection, index_name)
+    if connection.dialect.name == "sqlite":
+        # get_workshops orders by datetime(created_at) on SQLite to normalize stored formats
+        connection.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_workshops_created_at_normalized ON workshops (datetime(created_at), id)"
+        ))
+
+
+@migration(4, "Registration counters on workshops", transactional=False)
+def _registration_counters(connection):
+    # Autocommit: each column add holds its lock on workshops only briefly, and
+    # the backfill commits per id range instead of recounting under one lock
+    from registration_counters import reconcile
+    for column in ("confirmed_count", "pending_count", "rejected_count"):
+        add_column(connection, "workshops", f"{column} INTEGER NOT NULL DEFAULT 0")
+    last_id = connection.execute(text("SELECT MAX(id) FROM workshops")).scalar() or 0
+    for after_id in range(0, last_id, COUNTER_BACKFILL_BATCH):
+        reconcile(connection, after_id, after_id + COUNTER_BACKFILL_BATCH)
+
+
+@migration(5, "Tag lookup index for tag filters", transactional=False)
+def _tag_filter_index(connection):
+    create_index(connection, "ix_workshop_tags_tag_workshop")
+
+
+@migration(6, "Native JSON columns for workshop detail lists")
+def _detail_lists_json(connection):
+    # Rows written before this migration hold json.dumps() text, or '' for "none"
+    columns = ("prerequisites", "what_you_learn", "agenda")
+    if connection.dialect.name == "postgresql":
+        # Rewrites workshops under an exclusive lock; run outside peak hours on large catalogs
+        types = {column["name"]: column["type"] for column in inspect(connection).get_columns("workshops")}
+        alterations = [
+            f"ALTER COLUMN {column} TYPE JSONB USING NULLIF(btrim({column}), '')::jsonb"
+            for column in columns if not isinstance(types[column], JSONB)
+        ]
+        if alterations:
+            connection.execute(text(f"ALTER TABLE workshops {', '.join(alterations)}"))
+    else:
+        # SQLite's JSON type is text underneath; only empty strings need fixing
+        for column in columns:
+            connection.execute(text(f"UPDATE workshops SET {column} = NULL WHERE trim({column}) = ''"))
+
+
+@migration(7, "Background job queue")
+def _job_queue(connection):
+    from database import Job
+    Job.__table__.create(bind=connection, checkfirst=True)
+
+
+@migration(8, "Shared cache versions")
+def _cache_versions(connection):
+    from cache import VERSIONED_TABLES
+    from database import CacheVersion
+    CacheVersion.__table__.create(bind=connection, checkfirst=True)
+    existing = set(connection.execute(select(CacheVersion.name)).scalars())
+    missing = [{"name": name, "version": 0} for name in VERSIONED_TABLES if name not in existing]
+    if missing:
+        connection.execute(CacheVersion.__table__.insert(), missing)
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) > 1 and sys.argv[1] == "status":
+        with default_engine.begin() as connection:
+            done = applied_versions(connection)
+        for version, description, _, _ in MIGRATIONS:
+            print(f"[{'x' if version in done else ' '}] {version:03d} {description}")
+    else:
+        applied = run_migrations()
+        print(f"{len(applied)} migrations applied" if applied else "Schema is up to date")
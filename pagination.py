@@ -0,0 +1,89 @@
+import base64
+import json
+from datetime import datetime, date
+from typing import List, Optional, Sequence, Tuple
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query
+
+# Keyset (cursor) pagination helpers.
+# A page is described by the sort key values of its last row instead of an
+# OFFSET, so fetching page 500 costs the same index range scan as page 1.
+
+SortKey = Tuple[object, bool]  # (column expression, descending)
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"$dt": value.isoformat()}
+    if isinstance(value, date):
+        return {"$d": value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if "$dt" in value:
+            return datetime.fromisoformat(value["$dt"])
+        if "$d" in value:
+            return date.fromisoformat(value["$d"])
+    return value
+
+
+def encode_cursor(sort_by: str, values: Sequence) -> str:
+    """Serialize the sort key values of a row into an opaque, URL-safe cursor"""
+    payload = json.dumps({"s": sort_by, "v": [_encode_value(v) for v in values]}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort_by: str) -> Optional[List]:
+    """Return the sort key values in `cursor`, or None if it is malformed or for another ordering"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if payload.get("s") != sort_by:
+            return None
+        return [_decode_value(v) for v in payload["v"]]
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return None
+
+
+def order_by_keys(query: Query, keys: Sequence[SortKey]) -> Query:
+    """Apply ORDER BY for a list of sort keys"""
+    return query.order_by(*[expr.desc() if descending else expr.asc() for expr, descending in keys])
+
+
+def after_keys(keys: Sequence[SortKey], values: Sequence):
+    """WHERE clause selecting rows strictly after `values` in the keys' ordering.
+
+    Expands the row-value comparison (a, b) > (x, y) into
+    a > x OR (a = x AND b > y), which also handles mixed sort directions.
+    """
+    clauses = []
+    for i, (expr, descending) in enumerate(keys):
+        equal_prefix = [key == value for (key, _), value in zip(keys[:i], values[:i])]
+        beyond = expr < values[i] if descending else expr > values[i]
+        clauses.append(and_(*equal_prefix, beyond))
+    return or_(*clauses)
+
+
+def estimate_count(query: Query) -> Optional[int]:
+    """Planner row estimate for a query, without executing it.
+
+    Only PostgreSQL exposes a usable estimate; other backends return None
+    so the caller can fall back to an exact count.
+    """
+    session = query.session
+    bind = session.get_bind()
+    if bind.dialect.name != "postgresql":
+        return None
+    # Expanding IN parameters (e.g. the tag filter) are left as placeholders for
+    # execute() to fill in; exec_driver_sql needs them rendered as plain binds
+    compiled = query.order_by(None).statement.compile(
+        dialect=bind.dialect, compile_kwargs={"render_postcompile": True}
+    )
+    plan = session.connection().exec_driver_sql(
+        "EXPLAIN (FORMAT JSON) " + str(compiled), compiled.params
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
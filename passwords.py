@@ -0,0 +1,107 @@
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Optional
+import bcrypt
+from cache import TTLCache
+
+# Password hashing runs on a small dedicated thread pool instead of the
+# Streamlit script thread. bcrypt releases the GIL while hashing, so the pool
+# size bounds how many cores hashing can occupy, and the in-flight limit bounds
+# how much hashing work can queue up behind them.
+
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 2))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", PASSWORD_HASH_WORKERS * 4))
+PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", 10))
+
+# Login admission control: attempts allowed per client IP and per email in a
+# sliding LOGIN_WINDOW_SECONDS window. Every attempt costs one bcrypt hash.
+LOGIN_WINDOW_SECONDS = float(os.getenv("LOGIN_WINDOW_SECONDS", 60))
+LOGIN_ATTEMPTS_PER_IP = int(os.getenv("LOGIN_ATTEMPTS_PER_IP", 30))
+LOGIN_ATTEMPTS_PER_EMAIL = int(os.getenv("LOGIN_ATTEMPTS_PER_EMAIL", 10))
+
+_COST_PATTERN = re.compile(r"^\$2[abxy]?\$(\d{2})\$")
+
+
+class HashingBusy(RuntimeError):
+    """Raised when the hashing pool is saturated and the request is shed"""
+
+
+_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_pending = threading.BoundedSemaphore(PASSWORD_HASH_MAX_PENDING)
+
+
+def _run(func, *args):
+    if not _pending.acquire(blocking=False):
+        raise HashingBusy("Too many sign-in requests right now, please try again shortly")
+    try:
+        future = _executor.submit(func, *args)
+    except BaseException:
+        _pending.release()
+        raise
+    # The slot is held until the hash finishes, not until the caller stops
+    # waiting, so timed-out work still counts against the in-flight limit
+    future.add_done_callback(lambda _: _pending.release())
+    try:
+        return future.result(timeout=PASSWORD_HASH_TIMEOUT)
+    except FutureTimeoutError:
+        raise HashingBusy("Sign-in is taking too long, please try again shortly")
+
+
+def hash_password(password: str, rounds: int = None) -> str:
+    """bcrypt hash of password at the configured cost"""
+    salt = bcrypt.gensalt(rounds or BCRYPT_ROUNDS)
+    return _run(bcrypt.hashpw, password.encode('utf-8'), salt).decode('utf-8')
+
+
+def verify_password(password: str, password_hash: str) -> bool:
+    return _run(bcrypt.checkpw, password.encode('utf-8'), password_hash.encode('utf-8'))
+
+
+def hash_cost(password_hash: str) -> Optional[int]:
+    match = _COST_PATTERN.match(password_hash or "")
+    return int(match.group(1)) if match else None
+
+
+def needs_rehash(password_hash: str) -> bool:
+    """True if a stored hash was made with a lower cost than BCRYPT_ROUNDS"""
+    cost = hash_cost(password_hash)
+    return cost is None or cost < BCRYPT_ROUNDS
+
+
+class RateLimiter:
+    """Sliding-window attempt counter per key, bounded in memory"""
+
+    def __init__(self, limit: int, window: float, name: str, maxsize: int = 10_000):
+        self.limit = limit
+        self.window = window
+        self._attempts = TTLCache(maxsize=maxsize, ttl=window, name=name)
+        self._lock = threading.Lock()
+
+    def hit(self, key: str) -> bool:
+        """Record an attempt; False if the key is over its limit"""
+        now = time.monotonic()
+        with self._lock:
+            attempts = [t for t in self._attempts.get(key, ()) if t > now - self.window]
+            if len(attempts) >= self.limit:
+                self._attempts.set(key, tuple(attempts))
+                return False
+            attempts.append(now)
+            self._attempts.set(key, tuple(attempts))
+            return True
+
+
+_ip_limiter = RateLimiter(LOGIN_ATTEMPTS_PER_IP, LOGIN_WINDOW_SECONDS, name="login_ip")
+_email_limiter = RateLimiter(LOGIN_ATTEMPTS_PER_EMAIL, LOGIN_WINDOW_SECONDS, name="login_email")
+
+
+def admit_login(client_ip: Optional[str], email: str) -> tuple[bool, str]:
+    """Check a login attempt against the per-IP and per-email limits"""
+    if client_ip and not _ip_limiter.hit(client_ip):
+        return False, "Too many sign-in attempts from your network. Please wait a minute and try again."
+    if not _email_limiter.hit(email.strip().lower()):
+        return False, "Too many sign-in attempts for this account. Please wait a minute and try again."
+    return True, ""
@@ -0,0 +1,125 @@
+from datetime import datetime
+from typing import NamedTuple, Optional, Sequence
+from sqlalchemy import func
+from database import Workshop, Registration, User
+
+# Immutable records returned by WorkshopManager list reads.
+#
+# Records are built straight from column tuples, so they carry no session, never
+# lazy-load or refresh, pickle cheaply and can be cached and shared between
+# sessions and threads. Each record type doubles as its column profile: the
+# field names are the columns selected for it.
+
+DESCRIPTION_SNIPPET_LENGTH = 100
+
+
+class WorkshopCard(NamedTuple):
+    """A workshop as shown in catalog and management lists"""
+    id: int
+    title: str
+    organizer: str
+    organizer_user_id: Optional[int]
+    instructor: str
+    date: datetime
+    time: str
+    location: str
+    city: str
+    category: str
+    level: str
+    duration: str
+    price: float
+    organizer_upi_id: Optional[str]
+    max_seats: int
+    available_seats: int
+    confirmed_count: int
+    pending_count: int
+    rejected_count: int
+    mode: str
+    status: str
+    created_at: Optional[datetime]
+    description_snippet: Optional[str]
+
+    @classmethod
+    def from_row(cls, row: Sequence) -> "WorkshopCard":
+        card = cls._make(row[:len(cls._fields)])
+        # Seats follow from the confirmed counter loaded with the row
+        return card._replace(available_seats=max(0, card.max_seats - card.confirmed_count))
+
+
+class RegistrantSummary(NamedTuple):
+    """The user behind a registration"""
+    id: int
+    name: str
+    email: str
+    phone: Optional[str]
+
+
+class WorkshopSummary(NamedTuple):
+    """The workshop a registration is for"""
+    id: int
+    title: str
+    instructor: str
+    date: datetime
+    time: str
+    location: str
+    city: str
+    price: float
+    mode: str
+    available_seats: int
+
+
+class RegistrationRecord(NamedTuple):
+    """A registration with its user and workshop; wide columns are None unless selected"""
+    id: int
+    user_id: int
+    workshop_id: int
+    registration_type: str
+    status: str
+    payment_status: str
+    payment_method: Optional[str]
+    transaction_id: Optional[str]
+    upi_id: Optional[str]
+    payment_verified: bool
+    registered_at: Optional[datetime]
+    confirmed_at: Optional[datetime]
+    notes: Optional[str] = None
+    admin_notes: Optional[str] = None
+    payment_screenshot_url: Optional[str] = None
+    user: Optional[RegistrantSummary] = None
+    workshop: Optional[WorkshopSummary] = None
+
+
+# Narrow registration columns; the wide ones are opted into per view
+_REGISTRATION_FIELDS = RegistrationRecord._fields[:RegistrationRecord._fields.index("notes")]
+WIDE_REGISTRATION_FIELDS = ("notes", "admin_notes", "payment_screenshot_url")
+
+
+def workshop_card_columns() -> list:
+    """Columns for WorkshopCard.from_row, in field order"""
+    return [getattr(Workshop, field) for field in WorkshopCard._fields[:-1]] + [
+        func.substr(Workshop.description, 1, DESCRIPTION_SNIPPET_LENGTH)
+    ]
+
+
+def registration_columns(wide: Sequence[str] = (), user: bool = True, workshop: bool = True) -> list:
+    """Columns for registration_record; the caller joins users / workshops"""
+    columns = [getattr(Registration, field) for field in _REGISTRATION_FIELDS + tuple(wide)]
+    if user:
+        columns += [getattr(User, field) for field in RegistrantSummary._fields]
+    if workshop:
+        columns += [getattr(Workshop, field) for field in WorkshopSummary._fields]
+    return columns
+
+
+def registration_record(row: Sequence, wide: Sequence[str] = (), user: bool = True,
+                        workshop: bool = True) -> RegistrationRecord:
+    """Build a record from a row selected with the same registration_columns arguments"""
+    fields = _REGISTRATION_FIELDS + tuple(wide)
+    values = dict(zip(fields, row))
+    offset = len(fields)
+    if user:
+        values["user"] = RegistrantSummary._make(row[offset:offset + len(RegistrantSummary._fields)])
+        offset += len(RegistrantSummary._fields)
+    if workshop:
+        values["workshop"] = WorkshopSummary._make(row[offset:offset + len(WorkshopSummary._fields)])
+    return RegistrationRecord(**values)
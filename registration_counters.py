@@ -0,0 +1,81 @@
+from typing import Optional
+from sqlalchemy import case, func, or_, select, update
+from sqlalchemy.engine import Connection
+from database import Workshop, Registration
+
+# Denormalized registration tallies on workshops.
+#
+# Every registration status change updates its workshop's counters in the same
+# UPDATE that takes or releases the seat, so reads never have to COUNT(*) the
+# registrations table. reconcile() recomputes them from registrations and
+# repairs any drift (e.g. rows edited by hand or by an older app version).
+
+# Registration status -> Workshop counter column it is tallied in
+STATUS_COUNTERS = {
+    "confirmed": "confirmed_count",
+    "pending": "pending_count",
+    "payment_pending": "pending_count",
+    "rejected": "rejected_count",
+}
+
+
+def transition_values(from_status: Optional[str], to_status: Optional[str]) -> dict:
+    """Workshop UPDATE values for one registration moving between statuses.
+
+    None means the registration did not exist before / after. Confirming takes
+    a seat and un-confirming releases one.
+    """
+    deltas = {}
+    for status, step in ((from_status, -1), (to_status, 1)):
+        if status in STATUS_COUNTERS:
+            column = STATUS_COUNTERS[status]
+            deltas[column] = deltas.get(column, 0) + step
+    values = {column: getattr(Workshop, column) + delta for column, delta in deltas.items() if delta}
+    confirmed = deltas.get("confirmed_count", 0)
+    if confirmed:
+        values["available_seats"] = Workshop.available_seats - confirmed
+    return values
+
+
+def registration_total():
+    """SQL expression for all registrations tallied on a workshop"""
+    return Workshop.confirmed_count + Workshop.pending_count + Workshop.rejected_count
+
+
+def _tally(*statuses):
+    return select(func.count(Registration.id)).where(
+        Registration.workshop_id == Workshop.id,
+        Registration.status.in_(statuses)
+    ).correlate(Workshop).scalar_subquery()
+
+
+def reconcile_statement(after_id: Optional[int] = None, through_id: Optional[int] = None):
+    """UPDATE that recounts workshop counters and seats, touching only drifted rows.
+
+    after_id / through_id limit it to workshops with after_id < id <= through_id.
+    """
+    confirmed = _tally("confirmed")
+    pending = _tally("pending", "payment_pending")
+    rejected = _tally("rejected")
+    available = case((Workshop.max_seats > confirmed, Workshop.max_seats - confirmed), else_=0)
+    conditions = [or_(
+        Workshop.confirmed_count != confirmed,
+        Workshop.pending_count != pending,
+        Workshop.rejected_count != rejected,
+        Workshop.available_seats != available
+    )]
+    if after_id is not None:
+        conditions.append(Workshop.id > after_id)
+    if through_id is not None:
+        conditions.append(Workshop.id <= through_id)
+    return update(Workshop).where(*conditions).values(
+        confirmed_count=confirmed,
+        pending_count=pending,
+        rejected_count=rejected,
+        available_seats=available
+    ).execution_options(synchronize_session=False)
+
+
+def reconcile(connection: Connection, after_id: Optional[int] = None, through_id: Optional[int] = None) -> int:
+    """Repair counter drift; returns the number of workshops corrected"""
+    return connection.execute(reconcile_statement(after_id, through_id)).rowcount
@@ -0,0 +1,172 @@
+"""Streaming export of registrations to CSV or XLSX.
+
+Rows are read with a server-side cursor (stream_results/yield_per) as plain
+column tuples, never ORM objects, and written straight to a temporary file:
+csv.writer for CSV and openpyxl's write-only mode for XLSX. Memory use stays
+flat however many registrations a workshop has.
+
+    python registration_export.py --workshop-id 12 --status confirmed -o attendees.xlsx
+    python registration_export.py --organizer-id 3 --from 2025-01-01 --to 2025-03-31 -o q1.csv
+"""
+import argparse
+import csv
+import os
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+from typing import Iterator, Optional
+from sqlalchemy import select
+from database import engine, Registration, User, Workshop
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", 1000))
+# Export files are written here and deleted once older than EXPORT_MAX_AGE_SECONDS,
+# which also covers files left behind by sessions that ended or crashed
+EXPORT_DIR = os.getenv("EXPORT_DIR", os.path.join(tempfile.gettempdir(), "workshop-exports"))
+EXPORT_MAX_AGE_SECONDS = float(os.getenv("EXPORT_MAX_AGE_SECONDS", 3600))
+
+EXPORT_COLUMNS = [
+    ("Registration ID", Registration.id),
+    ("Registered At", Registration.registered_at),
+    ("Status", Registration.status),
+    ("Payment Status", Registration.payment_status),
+    ("Payment Method", Registration.payment_method),
+    ("Transaction ID", Registration.transaction_id),
+    ("Payment Verified", Registration.payment_verified),
+    ("Confirmed At", Registration.confirmed_at),
+    ("Attendee", User.name),
+    ("Email", User.email),
+    ("Phone", User.phone),
+    ("Workshop ID", Workshop.id),
+    ("Workshop", Workshop.title),
+    ("Workshop Date", Workshop.date),
+    ("City", Workshop.city),
+    ("Notes", Registration.notes),
+]
+
+# UI status choices -> stored statuses
+STATUS_FILTERS = {
+    "pending": ["pending", "payment_pending"],
+    "confirmed": ["confirmed"],
+    "rejected": ["rejected"],
+}
+
+
+def export_statement(organizer_user_id: Optional[int] = None, workshop_id: Optional[int] = None,
+                     status: Optional[str] = None, date_from: Optional[date] = None,
+                     date_to: Optional[date] = None):
+    """Column-only SELECT for the export; date_to is inclusive"""
+    statement = select(*[column for _, column in EXPORT_COLUMNS]).select_from(Registration).join(
+        User, Registration.user_id == User.id
+    ).join(Workshop, Registration.workshop_id == Workshop.id)
+    if organizer_user_id:
+        statement = statement.where(Workshop.organizer_user_id == organizer_user_id)
+    if workshop_id:
+        statement = statement.where(Registration.workshop_id == workshop_id)
+    if status and status != "All":
+        statement = statement.where(Registration.status.in_(STATUS_FILTERS.get(status, [status])))
+    if date_from:
+        statement = statement.where(Registration.registered_at >= datetime.combine(date_from, datetime.min.time()))
+    if date_to:
+        statement = statement.where(
+            Registration.registered_at < datetime.combine(date_to + timedelta(days=1), datetime.min.time())
+        )
+    return statement.order_by(Registration.workshop_id, Registration.registered_at, Registration.id)
+
+
+def iter_export_rows(statement, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[tuple]:
+    """Yield result rows from a server-side cursor, batch_size rows at a time"""
+    with engine.connect() as connection:
+        result = connection.execution_options(stream_results=True, yield_per=batch_size).execute(statement)
+        for row in result:
+            yield tuple(row)
+
+
+# Spreadsheet apps (and openpyxl) treat text starting with these as a formula
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+def _cell(value):
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d %H:%M")
+    if isinstance(value, bool):
+        return "Yes" if value else "No"
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        # Attendee-entered text must never become a live formula in the organizer's sheet
+        return "'" + value
+    return value
+
+
+def write_csv(rows: Iterator[tuple], path: str) -> int:
+    count = 0
+    with open(path, "w", newline="", encoding="utf-8-sig") as output:
+        writer = csv.writer(output)
+        writer.writerow([label for label, _ in EXPORT_COLUMNS])
+        for row in rows:
+            writer.writerow([_cell(value) for value in row])
+            count += 1
+    return count
+
+
+def write_xlsx(rows: Iterator[tuple], path: str) -> int:
+    from openpyxl import Workbook
+    # Write-only workbooks stream rows to disk instead of keeping cells in memory
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Registrations")
+    sheet.append([label for label, _ in EXPORT_COLUMNS])
+    count = 0
+    for row in rows:
+        sheet.append([_cell(value) for value in row])
+        count += 1
+    workbook.save(path)
+    return count
+
+
+def purge_old_exports(max_age: float = EXPORT_MAX_AGE_SECONDS) -> int:
+    """Delete export files in EXPORT_DIR older than max_age seconds; returns how many"""
+    cutoff = time.time() - max_age
+    removed = 0
+    try:
+        entries = list(os.scandir(EXPORT_DIR))
+    except FileNotFoundError:
+        return 0
+    for entry in entries:
+        try:
+            if entry.name.startswith("registrations-") and entry.stat().st_mtime < cutoff:
+                os.remove(entry.path)
+                removed += 1
+        except FileNotFoundError:
+            # Another process purged it first
+            continue
+    return removed
+
+
+def export_registrations(file_format: str = "csv", path: Optional[str] = None, **filters) -> tuple[str, int]:
+    """Write matching registrations to path (a new file in EXPORT_DIR by default); returns (path, row count)"""
+    if file_format not in ("csv", "xlsx"):
+        raise ValueError(f"Unsupported export format: {file_format}")
+    if path is None:
+        purge_old_exports()
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        fd, path = tempfile.mkstemp(dir=EXPORT_DIR, prefix="registrations-", suffix=f".{file_format}")
+        os.close(fd)
+    rows = iter_export_rows(export_statement(**filters))
+    count = write_csv(rows, path) if file_format == "csv" else write_xlsx(rows, path)
+    return path, count
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export registrations to CSV or XLSX")
+    parser.add_argument("-o", "--output", required=True, help="output file (.csv or .xlsx)")
+    parser.add_argument("--organizer-id", type=int)
+    parser.add_argument("--workshop-id", type=int)
+    parser.add_argument("--status", choices=list(STATUS_FILTERS))
+    parser.add_argument("--from", dest="date_from", type=date.fromisoformat, help="registered on or after (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="date_to", type=date.fromisoformat, help="registered on or before (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    file_format = "xlsx" if args.output.lower().endswith(".xlsx") else "csv"
+    _, count = export_registrations(
+        file_format, args.output, organizer_user_id=args.organizer_id, workshop_id=args.workshop_id,
+        status=args.status, date_from=args.date_from, date_to=args.date_to
+    )
+    print(f"Exported {count} registrations to {args.output}")
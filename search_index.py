@@ -0,0 +1,128 @@
+import re
+from typing import Optional, Tuple
+from sqlalchemy import text, literal_column, select, table, or_, func, false, cast, Float
+from sqlalchemy.orm import Query
+from database import Workshop
+
+# Full-text search over the workshop catalog.
+# PostgreSQL keeps a generated, weighted tsvector column with a GIN index;
+# SQLite mirrors the searchable columns into an external-content FTS5 table
+# kept in sync by triggers. Other backends fall back to ILIKE scans.
+
+SEARCH_CONFIG = "english"
+FTS_TABLE = "workshops_fts"
+
+_POSTGRES_DDL = [
+    f"""
+    ALTER TABLE workshops ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(instructor, '')), 'B') ||
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(organizer, '')), 'B') ||
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_workshops_search_vector ON workshops USING GIN (search_vector)",
+]
+
+_SQLITE_COLUMNS = "title, description, instructor, organizer"
+_SQLITE_DDL = [
+    f"""
+    CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        {_SQLITE_COLUMNS}, content='workshops', content_rowid='id', tokenize='porter unicode61'
+    )
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON workshops BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, {_SQLITE_COLUMNS})
+        VALUES (new.id, new.title, new.description, new.instructor, new.organizer);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON workshops BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_SQLITE_COLUMNS})
+        VALUES ('delete', old.id, old.title, old.description, old.instructor, old.organizer);
+    END
+    """,
+    f"""
+    CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {_SQLITE_COLUMNS} ON workshops BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {_SQLITE_COLUMNS})
+        VALUES ('delete', old.id, old.title, old.description, old.instructor, old.organizer);
+        INSERT INTO {FTS_TABLE}(rowid, {_SQLITE_COLUMNS})
+        VALUES (new.id, new.title, new.description, new.instructor, new.organizer);
+    END
+    """,
+]
+
+# bm25 column weights, in FTS5 column order: title, description, instructor, organizer
+_SQLITE_WEIGHTS = "10.0, 1.0, 4.0, 4.0"
+
+
+def install_search_index(connection) -> None:
+    """Create the search column/index or FTS table for the connected backend"""
+    dialect = connection.dialect.name
+    if dialect == "postgresql":
+        for statement in _POSTGRES_DDL:
+            connection.execute(text(statement))
+    elif dialect == "sqlite":
+        existed = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"),
+            {"name": FTS_TABLE}
+        ).first() is not None
+        for statement in _SQLITE_DDL:
+            connection.execute(text(statement))
+        if not existed:
+            # Index workshops that were created before the FTS table existed
+            connection.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+
+
+def search_terms(search: str) -> list[str]:
+    """Split user input into plain word tokens, dropping query syntax"""
+    return re.findall(r"\w+", search.lower())
+
+
+def apply_search(query: Query, search: str, dialect: str) -> Tuple[Query, Optional[object]]:
+    """Restrict a Workshop query to matches for `search`.
+
+    Every term must match, each as a prefix so results update while the user
+    is still typing. Input with no word characters (only punctuation or query
+    operators) matches nothing. Returns the filtered query and a relevance
+    expression (higher is better), or None when the backend has no full-text
+    support.
+    """
+    if not search.strip():
+        return query, None
+    terms = search_terms(search)
+    if not terms:
+        return query.filter(false()), None
+
+    if dialect == "postgresql":
+        ts_query = func.to_tsquery(SEARCH_CONFIG, " & ".join(f"{term}:*" for term in terms))
+        search_vector = literal_column("workshops.search_vector")
+        query = query.filter(search_vector.op("@@")(ts_query))
+        # ts_rank_cd returns real; cast so the rank round-trips through keyset
+        # cursors (JSON floats, bound as double precision) and compares exactly
+        return query, cast(func.ts_rank_cd(search_vector, ts_query), Float(53))
+
+    if dialect == "sqlite":
+        match = " ".join(f'"{term}"*' for term in terms)
+        matches = select(
+            literal_column("rowid").label("workshop_id"),
+            literal_column(f"bm25({FTS_TABLE}, {_SQLITE_WEIGHTS})").label("score")
+        ).select_from(table(FTS_TABLE)).where(
+            literal_column(FTS_TABLE).op("MATCH")(match)
+        ).subquery()
+        query = query.join(matches, matches.c.workshop_id == Workshop.id)
+        # bm25 scores are negative, lower meaning more relevant
+        return query, -matches.c.score
+
+    like = f"%{search}%"
+    query = query.filter(
+        or_(
+            Workshop.title.ilike(like),
+            Workshop.description.ilike(like),
+            Workshop.instructor.ilike(like),
+            Workshop.organizer.ilike(like)
+        )
+    )
+    return query, None
@@ -0,0 +1,180 @@
+"""Concurrent seat reservation stress test.
+
+Fires hundreds of simultaneous registrations and approvals at a single workshop
+and checks that no more seats are confirmed than the workshop holds and that
+its registration counters agree with a COUNT(*) of registrations per status.
+
+    python stress_reservations.py --seats 50 --attendees 400 --threads 64
+    python stress_reservations.py --database-url postgresql://localhost/workshop_stress
+
+Without --database-url a throwaway SQLite file is used as the stand-in database.
+Never point it at a production database: it creates its own users and workshops.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Stress test atomic seat reservation")
+    parser.add_argument("--database-url", help="Database to run against (defaults to a temporary SQLite file)")
+    parser.add_argument("--seats", type=int, default=50, help="Seats in the contested workshop")
+    parser.add_argument("--attendees", type=int, default=400, help="Concurrent registrations to attempt")
+    parser.add_argument("--threads", type=int, default=64, help="Worker threads")
+    return parser.parse_args()
+
+
+args = parse_args()
+if args.database_url:
+    os.environ["DATABASE_URL"] = args.database_url
+else:
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'stress.db')}"
+
+# The engine is configured from DATABASE_URL at import time
+from sqlalchemy import func
+from database import Base, engine, SessionLocal, User, Workshop, Registration
+from registration_counters import STATUS_COUNTERS
+from workshop_manager import WorkshopManager
+
+
+def create_fixture(mode: str, seats: int, attendees: int) -> tuple[int, list[int]]:
+    """Create one workshop and a batch of attendee accounts"""
+    db = SessionLocal()
+    try:
+        stamp = f"{mode}-{time.time_ns()}"
+        organizer = User(name="Stress Organizer", email=f"organizer-{stamp}@stress.local",
+                         password_hash="x", role="enterprise")
+        db.add(organizer)
+        db.flush()
+        workshop = Workshop(
+            title=f"Stress workshop ({mode})", organizer="Stress Organizer", organizer_user_id=organizer.id,
+            instructor="Stress", date=datetime.utcnow() + timedelta(days=30), time="10:00 AM",
+            location="Hall", city="Mumbai", category="Technology", level="Beginner", duration="1 hour",
+            price=0.0, max_seats=seats, available_seats=seats, mode=mode
+        )
+        attendees_list = [
+            User(name=f"Attendee {i}", email=f"attendee-{i}-{stamp}@stress.local", password_hash="x")
+            for i in range(attendees)
+        ]
+        db.add(workshop)
+        db.add_all(attendees_list)
+        db.commit()
+        return workshop.id, [u.id for u in attendees_list]
+    finally:
+        db.close()
+
+
+def run_concurrently(func, items, threads: int) -> list[tuple[bool, str]]:
+    """Run func over items from a thread pool, releasing all workers at once"""
+    start = threading.Event()
+
+    def worker(item):
+        start.wait()
+        return func(item)
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        futures = [pool.submit(worker, item) for item in items]
+        start.set()
+        return [future.result() for future in futures]
+
+
+def check(workshop_id: int, seats: int, label: str, results: list[tuple[bool, str]], elapsed: float) -> bool:
+    """Compare what callers were told with what the database holds"""
+    db = SessionLocal()
+    try:
+        workshop = db.query(Workshop).filter(Workshop.id == workshop_id).one()
+        by_status = dict(db.query(Registration.status, func.count(Registration.id)).filter(
+            Registration.workshop_id == workshop_id
+        ).group_by(Registration.status).all())
+    finally:
+        db.close()
+
+    # What each counter column should hold, from a COUNT(*) per status
+    tallies = {column: 0 for column in set(STATUS_COUNTERS.values())}
+    for status, count in by_status.items():
+        if status in STATUS_COUNTERS:
+            tallies[STATUS_COUNTERS[status]] += count
+    confirmed = tallies["confirmed_count"]
+    counters_match = all(getattr(workshop, column) == count for column, count in tallies.items())
+
+    succeeded = sum(1 for ok, _ in results if ok)
+    failures = {}
+    for ok, message in results:
+        if not ok:
+            failures[message] = failures.get(message, 0) + 1
+
+    consistent = (
+        confirmed <= seats
+        and workshop.available_seats >= 0
+        and workshop.available_seats == seats - confirmed
+        and succeeded == confirmed
+        and counters_match
+    )
+    print(f"[{label}] {len(results)} attempts in {elapsed:.2f}s ({len(results) / elapsed:.0f}/s)")
+    print(f"  confirmed={confirmed} seats={seats} available_seats={workshop.available_seats} reported_success={succeeded}")
+    print("  counters " + " ".join(
+        f"{column}={getattr(workshop, column)}/{count}" for column, count in sorted(tallies.items())
+    ) + " (stored/counted)")
+    for message, count in sorted(failures.items(), key=lambda item: -item[1]):
+        print(f"  rejected x{count}: {message}")
+    print(f"  {'OK' if consistent else 'OVERSOLD / INCONSISTENT'}")
+    return consistent
+
+
+def stress_registrations(seats: int, attendees: int, threads: int) -> bool:
+    """Automated workshop: every registration confirms and takes a seat immediately"""
+    workshop_id, user_ids = create_fixture("automated", seats, attendees)
+
+    def register(user_id):
+        wm = WorkshopManager()
+        try:
+            return wm.register_for_workshop(user_id, workshop_id, {})
+        finally:
+            wm.close()
+
+    started = time.perf_counter()
+    results = run_concurrently(register, user_ids, threads)
+    return check(workshop_id, seats, "register_for_workshop", results, time.perf_counter() - started)
+
+
+def stress_approvals(seats: int, attendees: int, threads: int) -> bool:
+    """Manual workshop: pending registrations are approved concurrently"""
+    workshop_id, user_ids = create_fixture("manual", seats, attendees)
+
+    # Registered the normal way, so the workshop's pending counter is raised too
+    wm = WorkshopManager()
+    try:
+        for user_id in user_ids:
+            ok, message = wm.register_for_workshop(user_id, workshop_id, {})
+            if not ok:
+                raise RuntimeError(f"Could not seed registration: {message}")
+        registration_ids = [registration_id for (registration_id,) in wm.db.query(Registration.id).filter(
+            Registration.workshop_id == workshop_id
+        )]
+    finally:
+        wm.close()
+
+    def approve(registration_id):
+        wm = WorkshopManager()
+        try:
+            return wm.approve_registration(registration_id)
+        finally:
+            wm.close()
+
+    started = time.perf_counter()
+    # Each registration is approved twice to also exercise double-approval
+    results = run_concurrently(approve, registration_ids * 2, threads)
+    return check(workshop_id, seats, "approve_registration", results, time.perf_counter() - started)
+
+
+if __name__ == "__main__":
+    print(f"Database: {engine.url.render_as_string(hide_password=True)}")
+    Base.metadata.create_all(bind=engine)
+    ok = stress_registrations(args.seats, args.attendees, args.threads)
+    ok = stress_approvals(args.seats, args.attendees, args.threads) and ok
+    sys.exit(0 if ok else 1)
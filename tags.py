@@ -0,0 +1,99 @@
+import os
+from typing import Dict, Iterable
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from database import Tag, workshop_tags
+from cache import TTLCache
+
+# Set-based tag handling: a batch of tag names is resolved with one SELECT ... IN
+# (plus one upsert and one re-SELECT for names that do not exist yet), and
+# associations are written with one multi-row INSERT.
+#
+# Tags are never renamed or deleted, so name -> id mappings are cached for the
+# life of the process. Only ids read from committed rows are cached; ids of
+# tags created in the current transaction could still be rolled back.
+
+TAG_CACHE_SIZE = int(os.getenv("TAG_CACHE_SIZE", 10_000))
+_tag_ids = TTLCache(maxsize=TAG_CACHE_SIZE, name="tag_ids")
+_popular_tags = TTLCache(maxsize=4, ttl=300, name="popular_tags")
+
+
+def normalize_tag_names(names: Iterable[str]) -> list:
+    """Lower-cased, stripped, de-duplicated tag names in first-seen order"""
+    seen = {}
+    for name in names:
+        name = (name or "").strip().lower()[:50]
+        if name:
+            seen.setdefault(name, None)
+    return list(seen)
+
+
+def _insert_ignore(db: Session, table):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return postgresql.insert(table).on_conflict_do_nothing()
+    if dialect == "sqlite":
+        return sqlite.insert(table).on_conflict_do_nothing()
+    return None
+
+
+def lookup_tag_ids(db: Session, names: Iterable[str]) -> Dict[str, int]:
+    """Ids of the existing tags among names; unknown names are left out"""
+    found = {}
+    missing = []
+    for name in normalize_tag_names(names):
+        tag_id = _tag_ids.get(name)
+        if tag_id is None:
+            missing.append(name)
+        else:
+            found[name] = tag_id
+    if missing:
+        for name, tag_id in db.execute(select(Tag.name, Tag.id).where(Tag.name.in_(missing))).all():
+            _tag_ids.set(name, tag_id)
+            found[name] = tag_id
+    return found
+
+
+def resolve_tag_ids(db: Session, names: Iterable[str]) -> Dict[str, int]:
+    """Map tag names to ids, creating the missing tags in one statement"""
+    names = normalize_tag_names(names)
+    found = lookup_tag_ids(db, names)
+    missing = [name for name in names if name not in found]
+    if not missing:
+        return found
+    statement = _insert_ignore(db, Tag.__table__)
+    if statement is None:
+        statement = Tag.__table__.insert()
+    db.execute(statement, [{"name": name} for name in missing])
+    found.update(db.execute(select(Tag.name, Tag.id).where(Tag.name.in_(missing))).all())
+    return found
+
+
+def popular_tags(db: Session, limit: int = 30) -> list:
+    """Most used tag names, for filter pickers; refreshed every few minutes"""
+    def compute():
+        return list(db.execute(
+            select(Tag.name)
+            .join(workshop_tags, workshop_tags.c.tag_id == Tag.id)
+            .group_by(Tag.id, Tag.name)
+            .order_by(func.count().desc(), Tag.name)
+            .limit(limit)
+        ).scalars())
+    return _popular_tags.get_or_set(limit, compute)
+
+
+def link_tags(db: Session, pairs: Iterable[tuple]) -> None:
+    """Associate (workshop_id, tag_id) pairs, skipping ones that already exist"""
+    rows = [{"workshop_id": workshop_id, "tag_id": tag_id} for workshop_id, tag_id in set(pairs)]
+    if not rows:
+        return
+    statement = _insert_ignore(db, workshop_tags)
+    if statement is None:
+        existing = set(db.execute(select(workshop_tags.c.workshop_id, workshop_tags.c.tag_id).where(
+            workshop_tags.c.workshop_id.in_({row["workshop_id"] for row in rows})
+        )).all())
+        rows = [row for row in rows if (row["workshop_id"], row["tag_id"]) not in existing]
+        statement = workshop_tags.insert()
+    if rows:
+        db.execute(statement, rows)
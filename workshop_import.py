@@ -0,0 +1,241 @@
+import csv
+import io
+import os
+import time
+from datetime import date, datetime
+from typing import BinaryIO, Iterator
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+from database import Workshop
+from tags import normalize_tag_names, resolve_tag_ids, link_tags
+from cache import table_versions
+
+# Bulk workshop import from CSV or XLSX.
+#
+# Rows are streamed from the file (openpyxl read-only mode for XLSX), validated
+# and inserted in chunks: one multi-row INSERT per chunk, one tag upsert and one
+# association INSERT. Invalid rows are reported with their row number and
+# skipped; they never abort the rest of the import.
+
+IMPORT_CHUNK_SIZE = int(os.getenv("IMPORT_CHUNK_SIZE", 1000))
+MAX_REPORTED_ERRORS = 1000
+
+CITIES = ["Mumbai", "Bangalore", "Delhi", "Chennai", "Pune", "Hyderabad"]
+CATEGORIES = ["Technology", "Marketing", "Design", "Finance", "Creative", "Business"]
+LEVELS = ["Beginner", "Intermediate", "Advanced"]
+MODES = ["manual", "automated"]
+
+REQUIRED_COLUMNS = ["title", "instructor", "date", "time", "location", "city", "category", "level", "duration", "max_seats"]
+OPTIONAL_COLUMNS = ["organizer", "description", "price", "mode", "organizer_upi_id", "image_url", "tags",
+                    "prerequisites", "what_you_learn", "agenda"]
+TEMPLATE_COLUMNS = REQUIRED_COLUMNS + OPTIONAL_COLUMNS
+
+_LIMITS = {"title": 200, "organizer": 100, "instructor": 100, "time": 20, "location": 200,
+           "duration": 20, "organizer_upi_id": 100, "image_url": 500}
+_DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%Y/%m/%d")
+
+
+class RowError(ValueError):
+    """A row that cannot be imported; the message is shown to the organizer"""
+
+
+def template_csv() -> str:
+    """Header row (plus one example) for the import file"""
+    example = ["Intro to Python", "Asha Rao", "2025-09-01", "10:00 AM", "Tech Park", "Pune", "Technology",
+               "Beginner", "3 hours", "40", "", "Hands-on basics", "0", "automated", "", "", "python, coding",
+               "Laptop", "Variables; Functions", "Setup; Exercises"]
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(TEMPLATE_COLUMNS)
+    writer.writerow(example)
+    return output.getvalue()
+
+
+def iter_rows(source: BinaryIO, filename: str) -> Iterator[tuple]:
+    """Yield (row number, {column: value}) from a CSV or XLSX file without loading it whole"""
+    extension = os.path.splitext(filename)[1].lower()
+    if extension == ".csv":
+        reader = csv.reader(io.TextIOWrapper(source, encoding="utf-8-sig", newline=""))
+        rows = enumerate(reader, start=1)
+    elif extension in (".xlsx", ".xlsm"):
+        from openpyxl import load_workbook
+        workbook = load_workbook(source, read_only=True, data_only=True)
+        rows = enumerate(workbook.active.iter_rows(values_only=True), start=1)
+    else:
+        raise ValueError("Unsupported file type, upload a .csv or .xlsx file")
+
+    header = None
+    for row_number, values in rows:
+        if header is None:
+            header = [str(value or "").strip().lower().replace(" ", "_") for value in values]
+            missing = [column for column in REQUIRED_COLUMNS if column not in header]
+            if missing:
+                raise ValueError(f"Missing columns: {', '.join(missing)}")
+            continue
+        if not any(value not in (None, "") for value in values):
+            continue
+        yield row_number, dict(zip(header, values))
+
+
+def _text(row: dict, column: str) -> str:
+    value = row.get(column)
+    if value is None:
+        return ""
+    value = str(value).strip()
+    limit = _LIMITS.get(column)
+    if limit and len(value) > limit:
+        raise RowError(f"{column} is longer than {limit} characters")
+    return value
+
+
+def _choice(row: dict, column: str, choices: list, default: str = None) -> str:
+    value = _text(row, column) or default
+    for choice in choices:
+        if value and value.lower() == choice.lower():
+            return choice
+    raise RowError(f"{column} must be one of {', '.join(choices)}")
+
+
+def _date(value) -> datetime:
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime.combine(value, datetime.min.time())
+    value = str(value or "").strip()
+    for date_format in _DATE_FORMATS:
+        try:
+            return datetime.strptime(value, date_format)
+        except ValueError:
+            continue
+    raise RowError(f"date {value!r} is not a valid date (use YYYY-MM-DD)")
+
+
+def _number(value, column: str, cast, minimum):
+    try:
+        number = cast(float(value)) if value not in (None, "") else None
+    except (TypeError, ValueError):
+        raise RowError(f"{column} must be a number")
+    if number is None or number < minimum:
+        raise RowError(f"{column} must be at least {minimum}")
+    return number
+
+
+def _list(value) -> list:
+    return [item.strip() for item in str(value or "").split(";") if item.strip()]
+
+
+def parse_row(row: dict, organizer_user_id: int, default_organizer: str) -> tuple[dict, list]:
+    """Validate one row; returns (workshops INSERT values, tag names) or raises RowError"""
+    missing = [column for column in REQUIRED_COLUMNS if row.get(column) in (None, "")]
+    if missing:
+        raise RowError(f"Missing {', '.join(missing)}")
+
+    price = _number(row.get("price") or 0, "price", float, 0)
+    max_seats = _number(row.get("max_seats"), "max_seats", int, 1)
+    organizer_upi_id = _text(row, "organizer_upi_id") or None
+    if price > 0 and not organizer_upi_id:
+        raise RowError("organizer_upi_id is required for paid workshops")
+
+    values = {
+        "title": _text(row, "title"),
+        "description": _text(row, "description"),
+        "organizer": _text(row, "organizer") or default_organizer,
+        "organizer_user_id": organizer_user_id,
+        "instructor": _text(row, "instructor"),
+        "date": _date(row.get("date")),
+        "time": _text(row, "time"),
+        "location": _text(row, "location"),
+        "city": _choice(row, "city", CITIES),
+        "category": _choice(row, "category", CATEGORIES),
+        "level": _choice(row, "level", LEVELS),
+        "duration": _text(row, "duration"),
+        "price": price,
+        "organizer_upi_id": organizer_upi_id,
+        "max_seats": max_seats,
+        "available_seats": max_seats,
+        "mode": _choice(row, "mode", MODES, default="manual"),
+        "image_url": _text(row, "image_url"),
+        "prerequisites": _list(row.get("prerequisites")),
+        "what_you_learn": _list(row.get("what_you_learn")),
+        "agenda": _list(row.get("agenda")),
+    }
+    if not values["organizer"]:
+        raise RowError("Missing organizer")
+    tags = normalize_tag_names(str(row.get("tags") or "").replace(";", ",").split(","))
+    return values, tags
+
+
+def _insert_chunk(db: Session, chunk: list) -> list:
+    """Insert validated rows; returns [(row number, workshop id or error)]"""
+    try:
+        with db.begin_nested():
+            if any(tags for _, _, tags in chunk):
+                # Ids are needed to link tags; PostgreSQL keeps this a batched insert
+                ids = db.execute(insert(Workshop).returning(Workshop.id, sort_by_parameter_order=True),
+                                 [values for _, values, _ in chunk]).scalars().all()
+            else:
+                db.execute(insert(Workshop), [values for _, values, _ in chunk])
+                ids = [None] * len(chunk)
+        return list(zip((row_number for row_number, _, _ in chunk), ids))
+    except Exception:
+        # Find the offending rows one at a time so the rest of the chunk still lands
+        results = []
+        for row_number, values, _ in chunk:
+            try:
+                with db.begin_nested():
+                    workshop_id = db.execute(insert(Workshop).returning(Workshop.id), values).scalar_one()
+                results.append((row_number, workshop_id))
+            except Exception as e:
+                results.append((row_number, RowError(f"Database rejected row: {str(e).splitlines()[0]}")))
+        return results
+
+
+def import_workshops(db: Session, source: BinaryIO, filename: str, organizer_user_id: int,
+                     default_organizer: str = "", chunk_size: int = IMPORT_CHUNK_SIZE) -> dict:
+    """Import workshops from a CSV/XLSX file; each chunk is committed on its own"""
+    started = time.perf_counter()
+    result = {'rows': 0, 'imported': 0, 'failed': 0, 'errors': [], 'seconds': 0.0}
+
+    def report(row_number, message):
+        result['failed'] += 1
+        if len(result['errors']) < MAX_REPORTED_ERRORS:
+            result['errors'].append((row_number, message))
+
+    def flush(chunk):
+        if not chunk:
+            return
+        tags_by_row = {row_number: tags for row_number, _, tags in chunk}
+        inserted = []
+        for row_number, outcome in _insert_chunk(db, chunk):
+            if isinstance(outcome, Exception):
+                report(row_number, str(outcome))
+            else:
+                inserted.append((row_number, outcome))
+        tag_ids = resolve_tag_ids(db, (tag for row_number, _ in inserted for tag in tags_by_row[row_number]))
+        link_tags(db, ((workshop_id, tag_ids[tag]) for row_number, workshop_id in inserted
+                       for tag in tags_by_row[row_number]))
+        db.commit()
+        if inserted:
+            table_versions.bump("workshops")
+        result['imported'] += len(inserted)
+
+    try:
+        chunk = []
+        for row_number, row in iter_rows(source, filename):
+            result['rows'] += 1
+            try:
+                values, tags = parse_row(row, organizer_user_id, default_organizer)
+            except RowError as e:
+                report(row_number, str(e))
+                continue
+            chunk.append((row_number, values, tags))
+            if len(chunk) >= chunk_size:
+                flush(chunk)
+                chunk = []
+        flush(chunk)
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        result['seconds'] = time.perf_counter() - started
+    return result
@@ -1,23 +1,75 @@
 import streamlit as st
+import os
 import json
 from datetime import datetime, date
 from typing import List, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, func
+from sqlalchemy import and_, or_, case, func, update, select
 from database import Workshop, Registration, User, Tag, SessionLocal, workshop_tags
+from search_index import apply_search
+from registration_counters import transition_values, registration_total, reconcile
+from workshop_import import import_workshops
+from tags import lookup_tag_ids, resolve_tag_ids, link_tags, popular_tags
+from pagination import encode_cursor, decode_cursor, order_by_keys, after_keys, estimate_count
+from cache import TTLCache, table_versions
+from job_queue import enqueue
+from records import (WorkshopCard, RegistrationRecord, workshop_card_columns,
+                     registration_columns, registration_record)
 import pandas as pd
 
+# Admin dashboard reruns within this window reuse the last computed statistics
+DASHBOARD_STATS_TTL = float(os.getenv("DASHBOARD_STATS_TTL", 30))
+_dashboard_stats_cache = TTLCache(maxsize=1, ttl=DASHBOARD_STATS_TTL, name="dashboard_stats")
+
+# Browse results shared across sessions, keyed by normalized filters plus the
+# workshops/registrations versions. The versions live in the database and are
+# bumped by every writer, so a write from any process invalidates the entries;
+# the TTL only bounds writes that bypass the bump (hand-edited rows).
+BROWSE_CACHE_SIZE = int(os.getenv("BROWSE_CACHE_SIZE", 256))
+BROWSE_CACHE_TTL = float(os.getenv("BROWSE_CACHE_TTL", 300))
+_browse_cache = TTLCache(maxsize=BROWSE_CACHE_SIZE, ttl=BROWSE_CACHE_TTL, name="browse")
+_CATALOG_TABLES = ("workshops", "registrations")
+
+# Filter values that mean "no filter"
+_FILTER_DEFAULTS = {'All', 'All Categories', 'All Cities', 'All Levels'}
+
+def _normalize_filters(filters: Optional[dict]) -> tuple:
+    """Hashable form of a filters dict, ignoring unset and catch-all values"""
+    normalized = []
+    for key, value in (filters or {}).items():
+        if isinstance(value, (list, tuple, set)):
+            value = tuple(sorted(value))
+        if value is None or value in ('', ()) or value in _FILTER_DEFAULTS:
+            continue
+        if isinstance(value, str):
+            value = value.strip()
+            if key == 'search':
+                value = ' '.join(value.lower().split())
+        normalized.append((key, value))
+    return tuple(sorted(normalized))
+
+def get_cache_stats() -> List[dict]:
+    """Hit/miss statistics for the shared result caches"""
+    return [_browse_cache.stats(), _dashboard_stats_cache.stats()]
+
 class WorkshopManager:
-    def __init__(self):
+    def __init__(self, db: Optional[Session] = None):
+        # A caller-provided session (e.g. the app's per-run ScopedSession) is
+        # owned by the caller; otherwise the manager opens and closes its own
         try:
-            self.db = SessionLocal()
+            self._owns_session = db is None
+            self.db = SessionLocal() if db is None else db
         except Exception as e:
             print(f"Database connection error: {e}")
             raise
     
     def close(self):
         try:
-            self.db.close()
+            if self._owns_session:
+                self.db.close()
+            else:
+                # Release the connection but leave the session to its owner
+                self.db.rollback()
         except:
             pass
     
@@ -44,25 +96,31 @@ class WorkshopManager:
                 max_seats=int(workshop_data['max_seats']),
                 available_seats=int(workshop_data['max_seats']),
                 mode=workshop_data.get('mode', 'manual'),
-                prerequisites=json.dumps(workshop_data.get('prerequisites', [])),
-                what_you_learn=json.dumps(workshop_data.get('what_you_learn', [])),
-                agenda=json.dumps(workshop_data.get('agenda', [])),
+                prerequisites=workshop_data.get('prerequisites', []),
+                what_you_learn=workshop_data.get('what_you_learn', []),
+                agenda=workshop_data.get('agenda', []),
                 image_url=workshop_data.get('image_url', '')
             )
             
             self.db.add(workshop)
-            self.db.commit()
+            self.db.flush()
             
-            # Add tags if provided
+            # Add tags if provided, in the same transaction as the workshop
             if workshop_data.get('tags'):
                 self._add_tags_to_workshop(workshop.id, workshop_data['tags'])
             
+            self.db.commit()
+            table_versions.bump("workshops")
             return True, f"Workshop '{workshop.title}' created successfully!"
         
         except Exception as e:
             self.db.rollback()
             return False, f"Error creating workshop: {str(e)}"
     
+    def import_workshops(self, source, filename: str, organizer_user_id: int, default_organizer: str = "") -> dict:
+        """Bulk-create workshops from a CSV/XLSX upload; raises ValueError for unreadable files"""
+        return import_workshops(self.db, source, filename, organizer_user_id, default_organizer)
+    
     def update_workshop(self, workshop_id: int, workshop_data: dict) -> tuple[bool, str]:
         """Update an existing workshop"""
         try:
@@ -72,28 +130,38 @@ class WorkshopManager:
             
             # Update fields
             for key, value in workshop_data.items():
-                if key == 'date':
+                if key == 'tags':
+                    # Replace the tag set with the submitted one
+                    self.db.execute(workshop_tags.delete().where(workshop_tags.c.workshop_id == workshop_id))
+                    self._add_tags_to_workshop(workshop_id, value)
+                    self.db.expire(workshop, ['tags'])
+                    continue
+                elif key == 'date':
                     value = datetime.combine(value, datetime.min.time())
                 elif key == 'price':
                     value = float(value)
                 elif key in ['max_seats', 'available_seats']:
                     value = int(value)
                 elif key in ['prerequisites', 'what_you_learn', 'agenda']:
-                    value = json.dumps(value) if isinstance(value, list) else value
+                    # Native JSON columns; still accept the old pre-encoded strings
+                    value = json.loads(value) if isinstance(value, str) else value
                 
                 if hasattr(workshop, key):
                     setattr(workshop, key, value)
             
-            # Update available seats if max_seats changed
+            # Update available seats if max_seats changed. Computed in the UPDATE from the
+            # row's current confirmed_count, so an approval committed since the workshop
+            # was loaded is not overwritten. SET expressions see the old row, hence the
+            # new max_seats is bound as a value rather than read from the column
             if 'max_seats' in workshop_data:
-                # Calculate new available seats based on current registrations
-                confirmed_registrations = self.db.query(Registration).filter(
-                    Registration.workshop_id == workshop_id,
-                    Registration.status == "confirmed"
-                ).count()
-                workshop.available_seats = max(0, workshop.max_seats - confirmed_registrations)
+                max_seats = workshop.max_seats
+                workshop.available_seats = case(
+                    (Workshop.confirmed_count < max_seats, max_seats - Workshop.confirmed_count),
+                    else_=0
+                )
             
             self.db.commit()
+            table_versions.bump("workshops")
             return True, f"Workshop '{workshop.title}' updated successfully!"
         
         except Exception as e:
@@ -121,27 +189,42 @@ class WorkshopManager:
             
             self.db.delete(workshop)
             self.db.commit()
+            table_versions.bump("workshops")
             return True, f"Workshop '{workshop.title}' deleted successfully!"
         
         except Exception as e:
             self.db.rollback()
             return False, f"Error deleting workshop: {str(e)}"
     
-    def get_workshops(self, filters: dict = None, page: int = 1, per_page: int = 10) -> dict:
-        """Get workshops with optional filtering and pagination"""
+    def get_workshops(self, filters: dict = None, page: int = 1, per_page: int = 10,
+                      cursor: Optional[str] = None, count: Optional[str] = 'exact',
+                      use_cache: bool = False) -> dict:
+        """Get workshops with optional filtering and pagination
+        
+        Pass the previous result's `next_cursor` as `cursor` to fetch the following
+        page. `count` is 'exact', 'estimate' (planner estimate where available) or
+        None to skip computing the total. Workshops are immutable WorkshopCard
+        records; with `use_cache` the result comes from the shared browse cache.
+        """
+        if use_cache:
+            key = (_normalize_filters(filters), page, per_page, cursor, count,
+                   table_versions.snapshot(self.db, *_CATALOG_TABLES))
+            result = _browse_cache.get(key)
+            if result is None:
+                result = self._query_workshops(filters, page, per_page, cursor, count)
+                _browse_cache.set(key, result)
+            return dict(result, workshops=list(result['workshops']))
+        return self._query_workshops(filters, page, per_page, cursor, count)
+    
+    def _query_workshops(self, filters: Optional[dict], page: int, per_page: int,
+                         cursor: Optional[str], count: Optional[str]) -> dict:
         query = self.db.query(Workshop)
+        relevance = None
+        dialect = self.db.get_bind().dialect.name
         
         if filters:
             if filters.get('search'):
-                search_term = f"%{filters['search']}%"
-                query = query.filter(
-                    or_(
-                        Workshop.title.ilike(search_term),
-                        Workshop.description.ilike(search_term),
-                        Workshop.instructor.ilike(search_term),
-                        Workshop.organizer.ilike(search_term)
-                    )
-                )
+                query, relevance = apply_search(query, filters['search'], dialect)
             
             if filters.get('category') and filters['category'] != 'All Categories':
                 query = query.filter(Workshop.category == filters['category'])
@@ -164,42 +247,75 @@ class WorkshopManager:
             # Filter by organizer (for enterprise users)
             if filters.get('organizer_user_id'):
                 query = query.filter(Workshop.organizer_user_id == filters['organizer_user_id'])
+            
+            # Workshops carrying any of the given tags, via ix_workshop_tags_tag_workshop
+            if filters.get('tags'):
+                tag_ids = list(lookup_tag_ids(self.db, filters['tags']).values())
+                query = query.filter(Workshop.id.in_(
+                    select(workshop_tags.c.workshop_id).where(workshop_tags.c.tag_id.in_(tag_ids))
+                ))
         
-        # Sorting
-        sort_by = filters.get('sort_by', 'created_at') if filters else 'created_at'
-        if sort_by == 'date':
-            query = query.order_by(Workshop.date)
+        # Sorting; searches rank by relevance unless another order was requested.
+        # Every ordering ends with Workshop.id so keyset cursors are unambiguous.
+        sort_by = (filters.get('sort_by') if filters else None) or ('relevance' if relevance is not None else 'created_at')
+        if sort_by == 'relevance' and relevance is not None:
+            sort_keys = [(relevance, True), (Workshop.id, False)]
+        elif sort_by == 'date':
+            sort_keys = [(Workshop.date, False), (Workshop.id, False)]
         elif sort_by == 'price_low':
-            query = query.order_by(Workshop.price)
+            sort_keys = [(func.coalesce(Workshop.price, 0), False), (Workshop.id, False)]
         elif sort_by == 'price_high':
-            query = query.order_by(Workshop.price.desc())
+            sort_keys = [(func.coalesce(Workshop.price, 0), True), (Workshop.id, True)]
         elif sort_by == 'title':
-            query = query.order_by(Workshop.title)
+            sort_keys = [(Workshop.title, False), (Workshop.id, False)]
         else:
-            query = query.order_by(Workshop.created_at.desc())
+            sort_by = 'created_at'
+            created_at = Workshop.created_at
+            if dialect == 'sqlite':
+                # SQLite stores CURRENT_TIMESTAMP defaults and bound datetimes in different
+                # text formats; normalize so cursor values compare equal to stored ones
+                created_at = func.datetime(Workshop.created_at)
+            sort_keys = [(created_at, True), (Workshop.id, True)]
         
-        # Pagination
-        total = query.count()
-        offset = (page - 1) * per_page
-        workshops = query.offset(offset).limit(per_page).all()
+        # Totals: exact COUNT, planner estimate (falls back to exact where unsupported), or skipped
+        total = None
+        total_is_estimate = False
+        if count == 'estimate':
+            total = estimate_count(query)
+            total_is_estimate = total is not None
+        if count == 'exact' or (count == 'estimate' and total is None):
+            total = query.order_by(None).count()
         
-        # Update available seats for all workshops before returning
-        for workshop in workshops:
-            confirmed_registrations = self.db.query(Registration).filter(
-                Registration.workshop_id == workshop.id,
-                Registration.status == "confirmed"
-            ).count()
-            workshop.available_seats = max(0, workshop.max_seats - confirmed_registrations)
+        # Page rows are card columns only, turned into records rather than ORM instances
+        card_columns = workshop_card_columns()
+        page_query = order_by_keys(query.with_entities(*card_columns), sort_keys)
+        if cursor:
+            after = decode_cursor(cursor, sort_by)
+            if after is not None:
+                page_query = page_query.filter(after_keys(sort_keys, after))
+        elif page > 1:
+            # Legacy offset paging; cursors keep deep pages as cheap as the first
+            page_query = page_query.offset((page - 1) * per_page)
         
-        # Commit the updates
-        self.db.commit()
+        # One extra row tells us whether another page follows
+        rows = page_query.add_columns(
+            *[expr for expr, _ in sort_keys]
+        ).limit(per_page + 1).all()
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+        
+        workshops = [WorkshopCard.from_row(row) for row in rows]
+        next_cursor = encode_cursor(sort_by, rows[-1][len(card_columns):]) if has_more else None
         
         return {
             'workshops': workshops,
             'total': total,
+            'total_is_estimate': total_is_estimate,
             'page': page,
             'per_page': per_page,
-            'total_pages': (total + per_page - 1) // per_page
+            'total_pages': (total + per_page - 1) // per_page if total is not None else None,
+            'next_cursor': next_cursor,
+            'has_more': has_more
         }
     
     def get_workshop_by_id(self, workshop_id: int) -> Optional[Workshop]:
@@ -235,6 +351,12 @@ class WorkshopManager:
                 status = "pending" if workshop.mode == "manual" else "payment_pending"
                 payment_status = "pending"
             
+            # Counters (and, for auto-confirmed registrations, the seat) are claimed
+            # atomically in the same transaction as the insert
+            if not self._apply_transition(workshop_id, None, status):
+                self.db.rollback()
+                return False, "No available seats for this workshop"
+            
             registration = Registration(
                 user_id=user_id,
                 workshop_id=workshop_id,
@@ -249,12 +371,14 @@ class WorkshopManager:
             )
             
             self.db.add(registration)
-            
-            # Update available seats if auto-confirmed
-            if status == "confirmed":
-                workshop.available_seats -= 1
-            
+            self.db.flush()
+            # Follow-up work runs on a job worker; the jobs commit with the registration
+            if registration.payment_screenshot_url:
+                enqueue(self.db, "process_screenshot",
+                        {"registration_id": registration.id, "key": registration.payment_screenshot_url})
+            enqueue(self.db, "registration_event", {"registration_id": registration.id, "event": "registration.created"})
             self.db.commit()
+            table_versions.bump("workshops", "registrations")
             
             return True, f"Registration submitted successfully! Status: {status.replace('_', ' ').title()}"
         
@@ -262,13 +386,67 @@ class WorkshopManager:
             self.db.rollback()
             return False, f"Registration failed: {str(e)}"
     
-    def get_user_registrations(self, user_id: int) -> List[Registration]:
-        """Get all registrations for a user"""
-        return self.db.query(Registration).filter(Registration.user_id == user_id).all()
+    def _registration_query(self, wide: tuple = (), user: bool = True, workshop: bool = True):
+        """Column query for RegistrationRecords, with users / workshops joined in"""
+        query = self.db.query(*registration_columns(wide, user, workshop))
+        if user:
+            query = query.join(User, Registration.user_id == User.id)
+        if workshop:
+            query = query.join(Workshop, Registration.workshop_id == Workshop.id)
+        return query
+    
+    def get_user_registrations(self, user_id: int) -> List[RegistrationRecord]:
+        """Get all registrations for a user, with their workshops loaded in the same query"""
+        wide = ('admin_notes',)
+        query = self._registration_query(wide, user=False).filter(Registration.user_id == user_id)
+        return [registration_record(row, wide, user=False) for row in query]
+    
+    def get_workshop_registrations(self, workshop_id: int) -> List[RegistrationRecord]:
+        """Get all registrations for a workshop, with their users loaded in the same query"""
+        wide = ('notes',)
+        query = self._registration_query(wide, workshop=False).filter(Registration.workshop_id == workshop_id)
+        return [registration_record(row, wide, workshop=False) for row in query]
     
-    def get_workshop_registrations(self, workshop_id: int) -> List[Registration]:
-        """Get all registrations for a workshop"""
-        return self.db.query(Registration).filter(Registration.workshop_id == workshop_id).all()
+    def get_recent_registrations(self, limit: int = 50) -> List[RegistrationRecord]:
+        """Get the most recent registrations across all workshops"""
+        query = self._registration_query().order_by(Registration.registered_at.desc()).limit(limit)
+        return [registration_record(row) for row in query]
+    
+    def get_enterprise_registrations(self, organizer_user_id: int, status: str = None, workshop_id: int = None,
+                                     page: int = 1, per_page: int = 20) -> dict:
+        """Get registrations for the workshops an enterprise organizes, filtered and paginated in SQL"""
+        wide = ('notes',)
+        query = self._registration_query(wide).filter(
+            Workshop.organizer_user_id == organizer_user_id
+        )
+        
+        if status and status != 'All':
+            query = query.filter(Registration.status == status)
+        
+        if workshop_id:
+            query = query.filter(Registration.workshop_id == workshop_id)
+        
+        total = query.count()
+        registrations = [registration_record(row, wide) for row in query.order_by(
+            Registration.registered_at.desc(), Registration.id.desc()
+        ).offset((page - 1) * per_page).limit(per_page)]
+        
+        return {
+            'registrations': registrations,
+            'total': total,
+            'page': page,
+            'per_page': per_page,
+            'total_pages': (total + per_page - 1) // per_page
+        }
+    
+    def get_enterprise_workshop_options(self, organizer_user_id: Optional[int]) -> List[tuple]:
+        """Get (id, title) of an enterprise's (or, with None, any) workshops that have registrations, for filter dropdowns"""
+        query = self.db.query(Workshop.id, Workshop.title).filter(
+            self.db.query(Registration.id).filter(Registration.workshop_id == Workshop.id).exists()
+        )
+        if organizer_user_id is not None:
+            query = query.filter(Workshop.organizer_user_id == organizer_user_id)
+        return query.order_by(Workshop.title, Workshop.id).all()
     
     def approve_registration(self, registration_id: int, admin_notes: str = "") -> tuple[bool, str]:
         """Approve a registration"""
@@ -277,24 +455,56 @@ class WorkshopManager:
             if not registration:
                 return False, "Registration not found"
             
-            workshop = registration.workshop
-            if workshop.available_seats <= 0:
-                return False, "No available seats remaining"
+            if registration.status not in ("pending", "payment_pending"):
+                return False, f"Registration is already {registration.status.replace('_', ' ')}"
             
-            registration.status = "confirmed"
-            registration.admin_notes = admin_notes
-            registration.confirmed_at = datetime.utcnow()
+            # Claim the seat and flip the status with conditional UPDATEs so concurrent
+            # approvals can neither oversell the workshop nor confirm a registration twice
+            if not self._apply_transition(registration.workshop_id, registration.status, "confirmed"):
+                self.db.rollback()
+                return False, "No available seats remaining"
             
-            # Update available seats
-            workshop.available_seats -= 1
+            confirmed = self.db.execute(
+                update(Registration)
+                .where(
+                    Registration.id == registration_id,
+                    Registration.status == registration.status
+                )
+                .values(status="confirmed", admin_notes=admin_notes, confirmed_at=datetime.utcnow())
+                .returning(Registration.id)
+                .execution_options(synchronize_session=False)
+            ).first()
+            if confirmed is None:
+                self.db.rollback()
+                return False, "Registration was already processed"
             
+            enqueue(self.db, "registration_event", {"registration_id": registration_id, "event": "registration.confirmed"})
             self.db.commit()
+            table_versions.bump("workshops", "registrations")
             return True, "Registration approved successfully"
         
         except Exception as e:
             self.db.rollback()
             return False, f"Error approving registration: {str(e)}"
     
+    def _apply_transition(self, workshop_id: int, from_status: Optional[str], to_status: str) -> bool:
+        """Atomically move one registration's tally between workshop counters.
+        
+        Confirming also takes a seat; returns False when the workshop is full.
+        """
+        values = transition_values(from_status, to_status)
+        if not values:
+            return True
+        statement = update(Workshop).where(Workshop.id == workshop_id)
+        if to_status == "confirmed" and from_status != "confirmed":
+            statement = statement.where(Workshop.available_seats > 0)
+        applied = self.db.execute(
+            statement.values(**values)
+            .returning(Workshop.id)
+            .execution_options(synchronize_session=False)
+        ).first()
+        return applied is not None
+    
     def reject_registration(self, registration_id: int, admin_notes: str = "") -> tuple[bool, str]:
         """Reject a registration"""
         try:
@@ -302,60 +512,205 @@ class WorkshopManager:
             if not registration:
                 return False, "Registration not found"
             
-            registration.status = "rejected"
-            registration.admin_notes = admin_notes
+            # Counters first, like approve_registration, so both paths lock the workshop
+            # row before the registration. Rejecting a confirmed registration gives its seat back
+            previous_status = registration.status
+            if not self._apply_transition(registration.workshop_id, previous_status, "rejected"):
+                self.db.rollback()
+                return False, "Workshop not found"
+            
+            rejected = self.db.execute(
+                update(Registration)
+                .where(Registration.id == registration_id, Registration.status == previous_status)
+                .values(status="rejected", admin_notes=admin_notes)
+                .returning(Registration.id)
+                .execution_options(synchronize_session=False)
+            ).first()
+            if rejected is None:
+                self.db.rollback()
+                return False, "Registration was already processed"
             
             self.db.commit()
+            # Rejecting a confirmed registration releases a seat on the workshop too
+            table_versions.bump("workshops", "registrations")
             return True, "Registration rejected"
         
         except Exception as e:
             self.db.rollback()
             return False, f"Error rejecting registration: {str(e)}"
     
-    def get_pending_registrations(self) -> List[Registration]:
-        """Get all pending registrations for admin review"""
-        return self.db.query(Registration).filter(
+    def get_pending_registrations(self, limit: int = None, summary: bool = False) -> List[RegistrationRecord]:
+        """Get all pending registrations for admin review; `summary` skips the wide review columns"""
+        # User and workshop are joined in, so the review queue costs one query
+        wide = () if summary else ('notes', 'admin_notes', 'payment_screenshot_url')
+        query = self._registration_query(wide).filter(
             or_(Registration.status == "pending", Registration.status == "payment_pending")
-        ).all()
+        ).order_by(Registration.registered_at, Registration.id)
+        if limit:
+            query = query.limit(limit)
+        return [registration_record(row, wide) for row in query]
     
-    def get_dashboard_stats(self) -> dict:
-        """Get dashboard statistics"""
-        total_workshops = self.db.query(Workshop).count()
-        active_workshops = self.db.query(Workshop).filter(Workshop.status == "active").count()
-        total_registrations = self.db.query(Registration).count()
-        confirmed_registrations = self.db.query(Registration).filter(Registration.status == "confirmed").count()
-        pending_registrations = self.db.query(Registration).filter(
-            or_(Registration.status == "pending", Registration.status == "payment_pending")
-        ).count()
-        total_revenue = self.db.query(func.sum(Workshop.price)).join(Registration).filter(
-            Registration.status == "confirmed"
-        ).scalar() or 0
+    def get_dashboard_stats(self, use_cache: bool = True) -> dict:
+        """Get dashboard statistics with one aggregate pass per table"""
+        if use_cache:
+            return _dashboard_stats_cache.get_or_set('dashboard', self._compute_dashboard_stats)
+        return self._compute_dashboard_stats()
+    
+    def _compute_dashboard_stats(self) -> dict:
+        """Compute dashboard statistics using conditional aggregation"""
+        # Registration figures come from the per-workshop counters, so this is a
+        # single pass over workshops rather than over registrations
+        (total_workshops, active_workshops, total_registrations, confirmed_registrations,
+         pending_registrations, total_revenue) = self.db.query(
+            func.count(Workshop.id),
+            func.count(Workshop.id).filter(Workshop.status == "active"),
+            func.sum(registration_total()),
+            func.sum(Workshop.confirmed_count),
+            func.sum(Workshop.pending_count),
+            func.sum(func.coalesce(Workshop.price, 0) * Workshop.confirmed_count)
+        ).one()
         
         return {
             'total_workshops': total_workshops,
             'active_workshops': active_workshops,
-            'total_registrations': total_registrations,
-            'confirmed_registrations': confirmed_registrations,
-            'pending_registrations': pending_registrations,
-            'total_revenue': total_revenue
+            'total_registrations': total_registrations or 0,
+            'confirmed_registrations': confirmed_registrations or 0,
+            'pending_registrations': pending_registrations or 0,
+            'total_revenue': total_revenue or 0
         }
     
-    def _add_tags_to_workshop(self, workshop_id: int, tag_names: List[str]):
-        """Add tags to a workshop"""
-        for tag_name in tag_names:
-            tag = self.db.query(Tag).filter(Tag.name == tag_name.strip().lower()).first()
-            if not tag:
-                tag = Tag(name=tag_name.strip().lower())
-                self.db.add(tag)
-                self.db.commit()
-            
-            # Add association if not exists
-            existing = self.db.query(workshop_tags).filter(
-                and_(workshop_tags.c.workshop_id == workshop_id, workshop_tags.c.tag_id == tag.id)
-            ).first()
-            
-            if not existing:
-                stmt = workshop_tags.insert().values(workshop_id=workshop_id, tag_id=tag.id)
-                self.db.execute(stmt)
+    def get_enterprise_stats(self, organizer_user_id: int) -> dict:
+        """Workshop and registration totals for one organizer, from the workshop counters"""
+        total_workshops, active_workshops, total_registrations, confirmed_registrations = self.db.query(
+            func.count(Workshop.id),
+            func.count(Workshop.id).filter(Workshop.status == "active"),
+            func.sum(registration_total()),
+            func.sum(Workshop.confirmed_count)
+        ).filter(Workshop.organizer_user_id == organizer_user_id).one()
+        
+        return {
+            'total_workshops': total_workshops,
+            'active_workshops': active_workshops,
+            'total_registrations': total_registrations or 0,
+            'confirmed_registrations': confirmed_registrations or 0
+        }
+    
+    def reconcile_registration_counters(self) -> tuple[bool, str]:
+        """Recount registrations per workshop and repair drifted counters"""
+        try:
+            repaired = reconcile(self.db.connection())
+            self.db.commit()
+            if repaired:
+                table_versions.bump("workshops")
+            return True, f"Repaired counters on {repaired} workshops"
+        except Exception as e:
+            self.db.rollback()
+            return False, f"Error reconciling counters: {str(e)}"
+    
+    def get_users(self, search: str = None, role: str = None, page: int = 1, per_page: int = 25) -> dict:
+        """Get users for admin management with search and pagination"""
+        query = self.db.query(User)
         
-        self.db.commit()
\ No newline at end of file
+        if search:
+            search_term = f"%{search}%"
+            query = query.filter(or_(User.name.ilike(search_term), User.email.ilike(search_term)))
+        
+        if role and role != 'All':
+            query = query.filter(User.role == role)
+        
+        total = query.count()
+        users = query.order_by(User.created_at.desc(), User.id.desc()).offset((page - 1) * per_page).limit(per_page).all()
+        
+        return {
+            'users': users,
+            'total': total,
+            'page': page,
+            'per_page': per_page,
+            'total_pages': (total + per_page - 1) // per_page
+        }
+    
+    def get_user_activity_summaries(self, user_ids: List[int], recent_limit: int = 3) -> dict:
+        """Get activity summaries for many users in a fixed number of grouped queries"""
+        summaries = {
+            user_id: {
+                'total_registrations': 0,
+                'confirmed_registrations': 0,
+                'workshops_created': 0,
+                'registrations_received': 0,
+                'recent_registrations': [],
+                'recent_workshops': []
+            }
+            for user_id in user_ids
+        }
+        if not user_ids:
+            return summaries
+        
+        # Registrations made by each user
+        for user_id, total, confirmed in self.db.query(
+            Registration.user_id,
+            func.count(Registration.id),
+            func.count(Registration.id).filter(Registration.status == "confirmed")
+        ).filter(Registration.user_id.in_(user_ids)).group_by(Registration.user_id):
+            summaries[user_id]['total_registrations'] = total
+            summaries[user_id]['confirmed_registrations'] = confirmed
+        
+        # Workshops organized, and registrations received across them
+        for organizer_id, workshops_created, registrations_received in self.db.query(
+            Workshop.organizer_user_id,
+            func.count(Workshop.id),
+            func.sum(registration_total())
+        ).filter(
+            Workshop.organizer_user_id.in_(user_ids)
+        ).group_by(Workshop.organizer_user_id):
+            summaries[organizer_id]['workshops_created'] = workshops_created
+            summaries[organizer_id]['registrations_received'] = registrations_received or 0
+        
+        # Most recent registrations per user, ranked with a window function
+        recent_rank = func.row_number().over(
+            partition_by=Registration.user_id,
+            order_by=(Registration.registered_at.desc(), Registration.id.desc())
+        ).label('recent_rank')
+        recent_registrations = self.db.query(
+            Registration.user_id, Workshop.title, Registration.status, recent_rank
+        ).join(Workshop, Registration.workshop_id == Workshop.id).filter(
+            Registration.user_id.in_(user_ids)
+        ).subquery()
+        for user_id, title, status in self.db.query(
+            recent_registrations.c.user_id, recent_registrations.c.title, recent_registrations.c.status
+        ).filter(recent_registrations.c.recent_rank <= recent_limit).order_by(
+            recent_registrations.c.user_id, recent_registrations.c.recent_rank
+        ):
+            summaries[user_id]['recent_registrations'].append((title, status))
+        
+        # Most recent workshops per organizer
+        recent_rank = func.row_number().over(
+            partition_by=Workshop.organizer_user_id,
+            order_by=(Workshop.created_at.desc(), Workshop.id.desc())
+        ).label('recent_rank')
+        recent_workshops = self.db.query(
+            Workshop.organizer_user_id, Workshop.title, Workshop.status, recent_rank
+        ).filter(Workshop.organizer_user_id.in_(user_ids)).subquery()
+        for organizer_id, title, status in self.db.query(
+            recent_workshops.c.organizer_user_id, recent_workshops.c.title, recent_workshops.c.status
+        ).filter(recent_workshops.c.recent_rank <= recent_limit).order_by(
+            recent_workshops.c.organizer_user_id, recent_workshops.c.recent_rank
+        ):
+            summaries[organizer_id]['recent_workshops'].append((title, status))
+        
+        return summaries
+    
+    def _add_tags_to_workshop(self, workshop_id: int, tag_names: List[str]):
+        """Add tags to a workshop with set-based statements; the caller commits"""
+        tag_ids = resolve_tag_ids(self.db, tag_names)
+        link_tags(self.db, ((workshop_id, tag_id) for tag_id in tag_ids.values()))
+    
+    def get_workshop_tags(self, workshop_id: int) -> List[str]:
+        """Tag names of one workshop"""
+        return list(self.db.execute(
+            select(Tag.name).join(workshop_tags, workshop_tags.c.tag_id == Tag.id)
+            .where(workshop_tags.c.workshop_id == workshop_id).order_by(Tag.name)
+        ).scalars())
+    
+    def get_popular_tags(self, limit: int = 30) -> List[str]:
+        """Most used tags, for the browse page tag filter"""
+        return popular_tags(self.db, limit)